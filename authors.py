@@ -1,10 +1,12 @@
+import logging
 import re
-import json
+import sys
+import weakref
 from abc import ABC, abstractmethod
-from types import MethodType
+from functools import lru_cache
 from typing import TYPE_CHECKING
-import pprint
 from unidecode import unidecode
+from config_handler import ConfigHandler
 
 if TYPE_CHECKING:
     from output_formatter import OutputFormatter  # Only for type hints, no runtime import
@@ -12,10 +14,22 @@ if TYPE_CHECKING:
 
 __all__ = ["Author", "AuthorList"]
 
+logger = logging.getLogger(__name__)
+
+NAME_CACHE_SIZE = 20000  # Distinct BibTeX name strings kept parsed
+INITIALS_CACHE_SIZE = 50000  # Distinct (name part, delimiter) pairs kept abbreviated
+_NAME_FIELDS = ("fullname", "firstname", "lastname", "von_part", "suffix", "sorting_key")
+
 class Author:
+    # Slots instead of a per-instance __dict__: a large library holds tens of thousands of authors
+    __slots__ = ("original_bibtex", "fullname", "firstname", "lastname", "von_part", "suffix",
+                 "sorting_key", "config_path", "__weakref__")
+
+    _registry = weakref.WeakValueDictionary()  # (name string, config_path) -> shared Author
+
     def __init__(self, bibtex_string: str, config_path: str = "configs/config.json"):
         """Initialize an Author object from a BibTeX-formatted name string."""
-        self.original_bibtex = bibtex_string.strip()
+        self.original_bibtex = sys.intern(bibtex_string.strip())
         self.fullname = ""
         # Parse the BibTeX name
         self.firstname = ""
@@ -23,44 +37,51 @@ class Author:
         self.von_part = ""
         self.suffix = ""
         self.sorting_key = ""
-        self.citation_key = ""
 
-        # Load special surnames from config
-        self.special_surnames = self._load_special_surnames(config_path)
+        # Special surnames are looked up on use, so config changes reach shared authors
+        self.config_path = sys.intern(config_path)
 
         self._parse_bibtex_name()
 
-    def initials(self, name_str, delim=''):
-        # Step 1: Split along whitespace and special characters
-        # Adding more common name-related special characters: ., :, _, (, ), [, ], {, }, &, @, !
-        parts = re.split(r"[ \-'/.:_()\[\]{}&@!]", name_str)
+    @classmethod
+    def shared(cls, bibtex_string: str, config_path: str = "configs/config.json"):
+        """
+        Return the Author for a BibTeX name string, reusing the instance if the same
+        name is already in use by another AuthorList (flyweight). Shared authors must
+        be treated as read-only.
+        """
+        key = (bibtex_string.strip(), config_path)
+        author = cls._registry.get(key)
+        if author is None:
+            author = cls(bibtex_string, config_path)
+            cls._registry[key] = author
+        return author
 
-        # Step 2: Further split each part along capital letters without removing them
+    def initials(self, name_str, delim=''):
+        return _initials(name_str, delim)
 
-        initials = ""
-        for part in parts:
-            if part:  # Avoid processing empty strings
-                split_parts = []
-                split_parts.extend(re.findall(r'[A-Z]?[a-z]+|[A-Z]+(?=[A-Z]|$)', part))
-                if len(split_parts) > 1:
-                    if(split_parts[0].istitle()):
+    @staticmethod
+    def cache_stats():
+        """Hit/miss counters of the name parsing and initials caches, for tuning their sizes."""
+        return {
+            "parse": _parse_name.cache_info()._asdict(),
+            "initials": _initials.cache_info()._asdict(),
+        }
 
-                        initials += split_parts.pop(0)
-                initials += "".join([p[0] for p in split_parts if p])
-                initials += delim
+    @staticmethod
+    def clear_caches():
+        _parse_name.cache_clear()
+        _initials.cache_clear()
 
-        return initials.strip()
 
+    @property
+    def special_surnames(self):
+        return self._load_special_surnames(self.config_path)
 
     def _load_special_surnames(self, config_path):
-        """Load special surnames from config.json."""
-        try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                config_data = json.load(f)
-            return set(config_data.get("special_surnames", []))
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Error loading config: {e}")
-            return set()
+        """Load special surnames from config.json (cached by ConfigHandler until the file changes)."""
+        return ConfigHandler.load_derived(config_path, "special_surnames",
+                                          lambda config: frozenset(config.get("special_surnames", [])))
 
     def css_class(self):
         name = ''.join([self.firstname, self.von_part, self.lastname, self.suffix]).strip()
@@ -69,6 +90,11 @@ class Author:
 
 
     def _parse_bibtex_name(self):
+        """Assigns the parsed name components; each distinct name string is only parsed once."""
+        for attr, value in zip(_NAME_FIELDS, _parse_name(self.original_bibtex)):
+            setattr(self, attr, value)
+
+    def _parse_bibtex_name_uncached(self):
         """Parses a BibTeX-style name and assigns attributes correctly."""
         parts = self.original_bibtex.split(",")
 
@@ -90,6 +116,10 @@ class Author:
         # Extract surname prefix if applicable
         self.sorting_key = self._generate_sorting_key()
 
+        # Intern the components: the same names recur across many papers
+        for attr in _NAME_FIELDS:
+            setattr(self, attr, sys.intern(getattr(self, attr)))
+
     def _split_von_part_lastname(self, last):
         """Extracts von parts (surname prefixes) from the last name."""
         lastname, von_part = [],[]
@@ -110,7 +140,6 @@ class Author:
         firstname = []
         first_parts = first.split()
         firstname.append(first_parts.pop(0))
-        self.veryfirstnameonly = firstname[0]
         while first_parts and first_parts[0][0].isupper():
             firstname.append(first_parts.pop(0))
 
@@ -159,6 +188,7 @@ class Author:
         parts = self.firstname.split()
         return " ".join(parts[1:]) if len(parts) > 1 else ""
 
+    @property
     def veryfirstnameonly(self):
         """Returns only the very first name."""
         return self.firstname.split()[0] if self.firstname else ""
@@ -187,7 +217,10 @@ class Author:
                 f"von_part='{self.von_part}', suffix='{self.suffix}', sorting_key='{self.sorting_key}')")
 
     def generate_citation_key(self, addon=""):
-        """Generate the citation key based on last name, special surnames, and formatted addon."""
+        """
+        Generate the citation key based on last name, special surnames, and formatted addon.
+        The key is returned, not stored: Authors are shared between papers and read-only.
+        """
         # Ensure addon is a string
         if isinstance(addon, int):
             addon = str(addon)  # Convert number to string
@@ -197,19 +230,14 @@ class Author:
             addon = addon[match.start():]  # Keep only the part starting from the four digits
 
         if self.lastname in self.special_surnames:
-            self.citation_key = f"{self.lastname}{self.firstname}{addon}"
-        else:
-            self.citation_key = f"{self.lastname}{addon}"
+            return f"{self.lastname}{self.firstname}{addon}"
+        return f"{self.lastname}{addon}"
 
     def get_citation_key(self, addon=""):
-        if addon:
-            self.generate_citation_key(addon)
-        elif not self.citation_key:
-            self.generate_citation_key()
-        return self.citation_key
+        return self.generate_citation_key(addon)
 
     def format(self, *args, **kwargs):
-        pprint.pprint(kwargs)
+        logger.debug("Author.format %s with args=%s, kwargs=%s", self.fullname, args, kwargs)
         formatter = kwargs.pop('formatter', None)
 
         if formatter:
@@ -219,7 +247,6 @@ class Author:
 
 
     def _format(self, *args):
-        print("_format is called")
         """Private method to format the author name using attributes and strings."""
         result = []
         for arg in args:
@@ -234,6 +261,40 @@ class Author:
         return cleaned_string
 
 
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def _parse_name(bibtex_string):
+    """Parse a stripped BibTeX name string into the values of _NAME_FIELDS."""
+    author = Author.__new__(Author)
+    author.original_bibtex = bibtex_string
+    for attr in _NAME_FIELDS:
+        setattr(author, attr, "")
+    author._parse_bibtex_name_uncached()
+    return tuple(getattr(author, attr) for attr in _NAME_FIELDS)
+
+
+@lru_cache(maxsize=INITIALS_CACHE_SIZE)
+def _initials(name_str, delim=''):
+    # Step 1: Split along whitespace and special characters
+    # Adding more common name-related special characters: ., :, _, (, ), [, ], {, }, &, @, !
+    parts = re.split(r"[ \-'/.:_()\[\]{}&@!]", name_str)
+
+    # Step 2: Further split each part along capital letters without removing them
+
+    initials = ""
+    for part in parts:
+        if part:  # Avoid processing empty strings
+            split_parts = []
+            split_parts.extend(re.findall(r'[A-Z]?[a-z]+|[A-Z]+(?=[A-Z]|$)', part))
+            if len(split_parts) > 1:
+                if(split_parts[0].istitle()):
+
+                    initials += split_parts.pop(0)
+            initials += "".join([p[0] for p in split_parts if p])
+            initials += delim
+
+    return initials.strip()
+
+
 for attr in ['fullname', 'firstname', 'lastname', 'von_part', 'suffix']:
     def prop(self, attr=attr):
         return self.initials(getattr(self, attr))
@@ -247,16 +308,35 @@ for attr in ['fullname', 'firstname', 'lastname', 'von_part', 'suffix']:
 
 
 class AuthorList:
+    STYLES_PATH = "configs/formatting_styles.json"
+    _style_methods = {}  # format_<style>_style methods currently installed on the class
+
     def __init__(self, author_string: str, config_path: str = "configs/config.json"):
         self.original = author_string.strip()
-        self.authors = [Author(name.strip(), config_path) for name in self.original.split(" and ")]
-        self._load_formatting_styles("configs/formatting_styles.json")
-
-    def _load_formatting_styles(self, path):
-        with open(path, 'r') as file:
-            styles = json.load(file).get("authorlist_formatting_styles", {})
+        self.authors = [Author.shared(name.strip(), config_path) for name in self.original.split(" and ")]
+        self._load_formatting_styles(self.STYLES_PATH)
 
-        for style_name, (args, kwargs) in styles.items():
+    @classmethod
+    def _load_formatting_styles(cls, path):
+        """
+        Install a format_<style>_style method on the class for every authorlist style.
+        The styles are compiled once per version of the styles file, so constructing
+        an AuthorList neither reads the file nor binds methods per instance.
+        """
+        methods = ConfigHandler.load_derived(path, "authorlist_style_methods", cls._compile_formatting_styles)
+        if methods is cls._style_methods:
+            return
+        for method_name in cls._style_methods:
+            if method_name not in methods:
+                delattr(cls, method_name)
+        for method_name, method in methods.items():
+            setattr(cls, method_name, method)
+        cls._style_methods = methods
+
+    @staticmethod
+    def _compile_formatting_styles(config):
+        methods = {}
+        for style_name, (args, kwargs) in config.get("authorlist_formatting_styles", {}).items():
             method_name = f"format_{style_name}_style"
 
             # Capture args and kwargs while adding support for a formatter argument
@@ -270,9 +350,9 @@ class AuthorList:
 
                 return self.format(*args, **combined_kwargs)
 
-            # Bind the method to the class instance
-            setattr(self, method_name, MethodType(inside_formatter, self))
-
+            inside_formatter.__name__ = method_name
+            methods[method_name] = inside_formatter
+        return methods
 
 
     @classmethod
@@ -317,7 +397,7 @@ class AuthorList:
             arr = self.get_array()
             return delim.join(arr)
         except Exception as e:  # Catch any exception and handle it
-            print(f"Error in get_string: {e}")  # Optional: Log the error
+            logger.warning("Error in get_string: %s", e)
             return ""  # Return an empty string as a fallback
 
     def format(self, *args, **kwargs):
@@ -0,0 +1,62 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+__all__ = ["BackgroundWorker"]
+
+logger = logging.getLogger(__name__)
+
+class BackgroundWorker:
+    """
+    Runs blocking calls (e.g. Notion requests) on a thread pool and hands their
+    results back to the Tk main loop. Tk is not thread-safe, so worker threads never
+    touch widgets: finished futures are collected by polling with after(), and the
+    callbacks run on the main thread.
+    """
+
+    POLL_INTERVAL = 50  # milliseconds
+
+    def __init__(self, root, max_workers=4):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="norman-worker")
+        self._pending = []
+        self._polling = False
+
+    def submit(self, func, *args, on_success=None, on_error=None, widget=None, **kwargs):
+        """
+        Run func(*args, **kwargs) in the background.
+        :param on_success: Called on the main thread with the return value.
+        :param on_error: Called on the main thread with the raised exception.
+        :param widget: Callbacks are dropped if this widget was destroyed in the meantime.
+        """
+        future = self.executor.submit(func, *args, **kwargs)
+        self._pending.append((future, on_success, on_error, widget))
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_INTERVAL, self._poll)
+        return future
+
+    def _poll(self):
+        finished, pending = [], []
+        for item in self._pending:
+            (finished if item[0].done() else pending).append(item)
+        self._pending = pending
+        if self._pending:
+            self.root.after(self.POLL_INTERVAL, self._poll)
+        else:
+            self._polling = False
+
+        for future, on_success, on_error, widget in finished:
+            if future.cancelled() or (widget is not None and not widget.winfo_exists()):
+                continue
+            error = future.exception()
+            if error is None:
+                if on_success:
+                    on_success(future.result())
+            elif on_error:
+                on_error(error)
+            else:
+                logger.error("Background task failed: %r", error)
+
+    def shutdown(self, wait=False):
+        """Stop the pool; with wait, running and queued calls are finished first, otherwise queued ones are dropped."""
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
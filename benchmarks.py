@@ -0,0 +1,238 @@
+"""
+Micro-benchmarks for NoRMan's bulk code paths.
+
+Run a single benchmark with e.g. `python benchmarks.py author_memory`, or all of
+them without arguments. Everything runs on synthetic data, no Notion access needed.
+"""
+import argparse
+import io
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+import tracemalloc
+from authors import AuthorList
+
+FIRSTNAMES = ["Anna", "John", "Li", "Maria", "Jeffrey", "Dominik", "Min", "Sara", "Thomas", "Yuki",
+              "Carlos", "Eva", "Hannah", "Ali", "Chen", "Jan Peter", "Mary-Ann", "Ole", "Priya", "Zoe"]
+TITLE_WORDS = ["Visual", "analytics", "of", "large", "graphs", "a", "study", "on", "the", "perception", "Scalable",
+               "interactive", "exploration", "for", "VR", "time", "series", "with", "uncertainty", "Towards",
+               "design", "space", "and", "evaluation", "GPU", "rendering", "in", "progressive", "dashboards"]
+LASTNAMES = ["Smith", "Wang", "Heer", "Moritz", "Chen", "Müller", "van der Berg", "Garcia", "Kim",
+             "Nguyen", "Rossi", "Tanaka", "de la Cruz", "Novak", "Ivanova", "Zhang", "O'Brien", "Lee",
+             "Schmidt", "Kowalski", "Larsen", "Dubois", "Silva", "Cohen", "Fischer", "Yang", "Ali"]
+
+
+def synthetic_author_strings(papers, authors_per_paper=5, pool_size=8000, seed=1):
+    """BibTeX author strings for `papers` papers drawing co-authors from a recurring pool."""
+    rng = random.Random(seed)
+    pool = []
+    for i in range(pool_size):
+        last = rng.choice(LASTNAMES) + (str(i) if i >= len(LASTNAMES) else "")
+        pool.append(f"{last}, {rng.choice(FIRSTNAMES)}")
+    return [" and ".join(rng.sample(pool, rng.randint(1, 2 * authors_per_paper - 1))) for _ in range(papers)]
+
+
+def synthetic_titles(count, seed=1):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(TITLE_WORDS, k=rng.randint(4, 14))).capitalize()
+            + (": " + " ".join(rng.choices(TITLE_WORDS, k=4)) if rng.random() < 0.3 else "")
+            for _ in range(count)]
+
+
+def write_synthetic_bib(path, entries, seed=1):
+    """Write a .bib file with `entries` article entries, each with a ~1 kB abstract."""
+    rng = random.Random(seed)
+    authors = synthetic_author_strings(entries, seed=seed)
+    titles = synthetic_titles(entries, seed=seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(entries):
+            abstract = " ".join(rng.choices(TITLE_WORDS, k=150))
+            f.write(f"@article{{key{i},\n  author = {{{authors[i]}}},\n  title = {{{titles[i]}}},\n"
+                    f"  journal = {{Computer Graphics Forum}},\n  year = {{{rng.randint(1990, 2025)}}},\n"
+                    f"  abstract = {{{abstract}}}\n}}\n\n")
+
+
+def _read_bib(reader, path):
+    """Runs in a fresh process: read the file and report entries, seconds and peak RSS in MB."""
+    started = time.perf_counter()
+    if reader == "stream":
+        from bibtex_stream import iter_entries
+        count = sum(1 for _ in iter_entries(path))
+    else:
+        import bibtexparser
+        with open(path, "r", encoding="utf-8") as f:
+            count = len(bibtexparser.load(f).entries)
+    elapsed = time.perf_counter() - started
+    return count, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_bib_stream(entries=100000, readers=("stream", "bibtexparser")):
+    """Peak RSS and entries/s of the streaming reader versus bibtexparser.load on one file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.bib")
+        write_synthetic_bib(path, entries)
+        print(f"bib_stream: {entries} entries, {os.path.getsize(path) / 1e6:.0f} MB")
+        for reader in readers:
+            # A fresh process per reader, so ru_maxrss only covers that reader
+            with multiprocessing.get_context("spawn").Pool(1) as pool:
+                count, elapsed, peak_mb = pool.apply(_read_bib, (reader, path))
+            print(f"  {reader}: {count} entries in {elapsed:.1f}s ({count / elapsed:.0f} entries/s), "
+                  f"peak RSS {peak_mb:.0f} MB")
+
+
+def synthetic_page_json(i, rng, authors):
+    """A Notion page object shaped like the reference database."""
+    def text(value):
+        return [{"type": "text", "text": {"content": value}, "plain_text": value}]
+    return {
+        "object": "page",
+        "id": f"page-{i}",
+        "last_edited_time": "2024-01-01T00:00:00.000Z",
+        "properties": {
+            "Key": {"type": "title", "title": text(f"Key{i}")},
+            "Papertrail": {"type": "rich_text", "rich_text": []},
+            "Bibtex": {"type": "rich_text", "rich_text": text(f"@article{{Key{i}, title = {{Paper {i}}}}}")},
+            "Year": {"type": "number", "number": rng.randint(1990, 2025)},
+            "Title": {"type": "rich_text", "rich_text": text(f"Paper {i}")},
+            "Project_tag": {"type": "multi_select", "multi_select": [{"name": "VISize"}]},
+            "Abstract": {"type": "rich_text", "rich_text": text(" ".join(rng.choices(TITLE_WORDS, k=150)))},
+            "Citation count": {"type": "number", "number": rng.randint(0, 500)},
+            "Type": {"type": "select", "select": {"name": "Paper"}},
+            "Notes": {"type": "rich_text", "rich_text": []},
+            "Link/DOI": {"type": "url", "url": f"https://doi.org/10.1/{i}"},
+            "Journal": {"type": "rich_text", "rich_text": text("Computer Graphics Forum")},
+            "Venue": {"type": "multi_select", "multi_select": [{"name": "EuroVis"}]},
+            "Authors": {"type": "multi_select", "multi_select": [{"name": name} for name in authors.split(" and ")]},
+            "Short_title": {"type": "rich_text", "rich_text": text(f"Paper {i}")},
+            "Short_title_manual": {"type": "checkbox", "checkbox": False},
+        },
+    }
+
+
+def bench_notion_pages(pages=12000):
+    """Decoding query results into NotionPages and encoding page data with prep_data."""
+    from notion import NotionAPI, NotionPage
+    rng = random.Random(1)
+    author_strings = synthetic_author_strings(pages)
+    results = [synthetic_page_json(i, rng, author_strings[i]) for i in range(pages)]
+    NotionPage(results[0])  # Load configs outside of the measurement
+
+    started = time.perf_counter()
+    decoded = [NotionPage(result) for result in results]
+    decode_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    keys = {page.key: page.notion_page_id for page in decoded}
+    keys_time = time.perf_counter() - started
+
+    api = NotionAPI.__new__(NotionAPI)  # prep_data needs no connection
+    data = [{"key": page.key, "title": page.title, "year": page.year, "abstract": page.abstract,
+             "authors": page.authors.get_array(), "venue": "EuroVis", "project": ["VISize"]} for page in decoded]
+    started = time.perf_counter()
+    for item in data:
+        api.prep_data(item)
+    encode_time = time.perf_counter() - started
+
+    print(f"notion_pages: {pages} pages, decode {decode_time / pages * 1e6:.1f} µs/page, "
+          f"key scan {keys_time * 1e3:.0f} ms, prep_data {encode_time / pages * 1e6:.1f} µs/page")
+    return decode_time, encode_time
+
+
+def bench_author_memory(papers=12000):
+    """Memory per author occurrence when holding a whole library of AuthorLists."""
+    author_strings = synthetic_author_strings(papers)
+    AuthorList("Warm, Up")  # Load configs outside of the measurement
+
+    tracemalloc.start()
+    library = [AuthorList(s) for s in author_strings]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    occurrences = sum(len(authors) for authors in library)
+    distinct = len({id(author) for authors in library for author in authors})
+    print(f"author_memory: {papers} papers, {occurrences} author occurrences, {distinct} Author objects")
+    print(f"  total {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB), "
+          f"{current / occurrences:.0f} bytes per author occurrence")
+    return current / occurrences
+
+
+def bench_render(citations=2000):
+    """Per-citation render time with debug logging disabled versus enabled."""
+    from citation_manager import CitationManager
+    cm = CitationManager()
+    cm.parse_bibtex("@article{x, author = {" + synthetic_author_strings(1)[0] + "}, "
+                    "title = {A Study of Things}, journal = {Computer Graphics Forum}, year = {2024}}")
+    root = logging.getLogger()
+    handler = logging.StreamHandler(io.StringIO())  # Pay for formatting and I/O, not for the terminal
+    previous_level = root.level
+
+    def run():
+        started = time.perf_counter()
+        for _ in range(citations):
+            cm.process_citation({"style": "APA"})
+        return (time.perf_counter() - started) / citations * 1e6
+
+    try:
+        root.setLevel(logging.WARNING)
+        disabled = run()
+        root.addHandler(handler)
+        root.setLevel(logging.DEBUG)
+        enabled = run()
+    finally:
+        root.removeHandler(handler)
+        root.setLevel(previous_level)
+
+    print(f"render: {citations} citations, {disabled:.1f} µs/citation with logging disabled, "
+          f"{enabled:.1f} µs/citation with DEBUG logging ({enabled / disabled:.1f}x)")
+    return disabled, enabled
+
+
+def bench_short_titles(titles=20000, fast=True):
+    """Batch create_short_titles versus one create_short_title per title, with the same tokenizer."""
+    from citation_manager import CitationManager
+    all_titles = synthetic_titles(titles)
+    cm = CitationManager()
+    cm.stopwords  # Load the stopwords outside of the measurement
+
+    started = time.perf_counter()
+    single = []
+    for title in all_titles:
+        cm._title = title  # Without the title setter, which always uses the default tokenizer
+        single.append(cm.create_short_title(fast=fast))
+    per_title = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = CitationManager.create_short_titles(all_titles, fast=fast)
+    batched = time.perf_counter() - started
+
+    tokenizer = "regex" if fast else "NLTK"
+    print(f"short_titles: {titles} titles ({tokenizer} tokenizer), per title {per_title * 1e3:.0f} ms, "
+          f"batch {batched * 1e3:.0f} ms ({per_title / batched:.1f}x), "
+          f"{sum(a != b for a, b in zip(single, batch))} differ from per-title")
+    return per_title, batched
+
+
+BENCHMARKS = {
+    "author_memory": bench_author_memory,
+    "render": bench_render,
+    "short_titles": bench_short_titles,
+    "bib_stream": bench_bib_stream,
+    "notion_pages": bench_notion_pages,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run NoRMan micro-benchmarks.")
+    parser.add_argument("names", nargs="*", help=f"Benchmarks to run (default: all): {', '.join(BENCHMARKS)}")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+    for name in args.names or BENCHMARKS:
+        started = time.perf_counter()
+        BENCHMARKS[name]()
+        print(f"  ({time.perf_counter() - started:.1f}s)")
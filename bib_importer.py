@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+import requests
+from bibtexparser.bibdatabase import BibDatabase
+from bibtexparser.bwriter import BibTexWriter
+from authors import AuthorList
+from bibtex_stream import iter_entries
+from citation_keys import CitationKeyIndex, sanitize_key
+from citation_manager import CitationManager
+from notion import NotionAPI, AsyncNotionAPI
+
+__all__ = ["BibImporter"]
+
+class BibImporter:
+    """
+    Headless import of a complete .bib file into the Notion database.
+
+    The file is parsed once, a citation key is generated for every entry via
+    Author.get_citation_key, collisions with existing pages are checked with a few
+    batched queries (or against the mirror), and pages are created (or updated)
+    concurrently.
+    Entries of the file that would get the same key are told apart by suffixes
+    (Heer2024a, Heer2024b, ...) from a CitationKeyIndex.
+    Every finished entry is appended to a checkpoint file, so an interrupted import
+    resumes where it stopped.
+    """
+
+    def __init__(self, bib_path, api=None, mirror=None, config_path="configs/config.json",
+                 project=None, update_existing=False, suffix_existing=False, max_concurrency=8,
+                 checkpoint_path=None):
+        """
+        :param bib_path: The .bib file to import.
+        :param api: NotionAPI instance; created from the default config if omitted.
+        :param mirror: Optional NotionMirror, used for the collision check and kept up to date.
+        :param project: Project tag(s) added to every imported page.
+        :param update_existing: Update pages whose key already exists instead of skipping them.
+        :param suffix_existing: Import entries whose key already exists under the next free suffixed key.
+        :param checkpoint_path: Defaults to '<bib_path>.checkpoint.jsonl'.
+        """
+        self.bib_path = bib_path
+        self.api = api if api else NotionAPI()
+        self.mirror = mirror
+        self.config_path = config_path
+        self.projects = [project] if isinstance(project, str) else list(project or [])
+        self.update_existing = update_existing
+        self.suffix_existing = suffix_existing
+        self.max_concurrency = max_concurrency
+        self.checkpoint_path = checkpoint_path if checkpoint_path else f"{bib_path}.checkpoint.jsonl"
+        self.writer = BibTexWriter()
+        self.writer.indent = '    '
+        self.cm = CitationManager(config_path)  # Venue and link are derived exactly as in the GUI
+
+    # Preparation
+
+    def load_entries(self):
+        """Stream the entries of the .bib file, without loading the whole file."""
+        return iter_entries(self.bib_path)
+
+    def citation_key(self, entry):
+        """The generated citation key of an entry, without regard to existing keys."""
+        if entry.get("author"):
+            first_author = AuthorList(entry["author"], self.config_path).first_author()
+            key = sanitize_key(first_author.get_citation_key(entry.get("year", "")))
+            if key:
+                return key
+        return entry.get("ID", "")
+
+    def prepare_entry(self, entry, key=None):
+        """Build the data dict expected by NotionAPI.create_page for one parsed entry."""
+        cm = self.cm
+        cm.clear_reference()
+        cm.load_entry(entry, short_title=False)
+
+        entry = dict(entry)
+        entry.pop("abstract", None)
+        entry.pop("eprint", None)
+        key = key if key else self.citation_key(entry)
+        entry["ID"] = key
+
+        db = BibDatabase()
+        db.entries = [entry]
+        return {
+            "key": key,
+            "bibtex": self.writer.write(db).strip(),
+            "title": cm.title,
+            "year": cm.year,
+            "project": self.projects,
+            "abstract": cm.abstract,
+            "journal": cm.journal,
+            "venue": cm.venue,
+            "link_doi": cm.link_doi,
+            "authors": cm.authors.get_array() if cm.authors else [],
+        }
+
+    def existing_keys(self, keys=None):
+        """
+        Map existing keys to their page ids: every key of the mirror, or, without a
+        mirror, the keys starting with one of `keys` (batched compound queries), or
+        every key of the database in one paginated pass.
+        """
+        if self.mirror is not None:
+            self.mirror.delta_sync()
+            return self.mirror.key_map()
+        if keys is not None:
+            # Prefix match, so suffixed keys (Heer2024a for Heer2024) are known as well
+            return self.api.find_pages_by_keys(keys, prefix=True)
+        return self.api.query_pages().key_map()
+
+    # Checkpointing
+
+    @staticmethod
+    def checkpoint_id(entry):
+        """
+        (original BibTeX ID, digest of the entry): identifies an entry in the checkpoint,
+        also when a file uses the same ID for different entries.
+        """
+        digest = hashlib.sha1(json.dumps(entry, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        return entry.get("ID"), digest.hexdigest()[:16]
+
+    def load_checkpoint(self):
+        """
+        Return {checkpoint_id: citation key} of the entries imported by previous runs.
+        Records of older checkpoints have no digest and are stored as (ID, None).
+        """
+        done = {}
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        done[(record["id"], record.get("entry"))] = record["key"]
+        return done
+
+    def is_done(self, entry, done):
+        return self.checkpoint_id(entry) in done or (entry.get("ID"), None) in done
+
+    # Import
+
+    def run(self):
+        return asyncio.run(self.run_async())
+
+    async def run_async(self):
+        started = time.perf_counter()
+        done = self.load_checkpoint()
+        total = 0
+        pending = []
+        for total, entry in enumerate(self.load_entries(), 1):
+            if not self.is_done(entry, done):
+                pending.append((entry, self.citation_key(entry)))
+
+        existing = self.existing_keys([key for _, key in pending])
+        imported_keys = set(done.values())  # Keys of this file created by previous runs
+        # Checkpointed keys count as taken even if the Notion query does not return them (yet)
+        index = CitationKeyIndex(set(existing) | imported_keys)
+        summary = Counter(resumed=len(done))
+
+        jobs = []
+        for entry, key in pending:
+            page_id = existing.get(key)
+            # Pages created by earlier runs of this file belong to other entries, never update them
+            if key in existing and self.update_existing and page_id is not None and key not in imported_keys:
+                jobs.append((self.checkpoint_id(entry), self.prepare_entry(entry, key), page_id))
+            elif key in existing and key not in imported_keys and not self.suffix_existing:
+                summary["collision"] += 1
+                print(f"Collision: {entry.get('ID')} -> {key} already exists, skipped")
+            else:
+                # Taken by another page or by an earlier entry of this file: next free suffix
+                new_key = index.reserve(key)
+                if new_key != key:
+                    summary["suffixed"] += 1
+                jobs.append((self.checkpoint_id(entry), self.prepare_entry(entry, new_key), None))
+
+        print(f"Importing {len(jobs)} of {total} entries ({len(done)} already done)")
+        with open(self.checkpoint_path, "a", encoding="utf-8") as checkpoint:
+            async with AsyncNotionAPI(self.api, self.max_concurrency) as client:
+                tasks = [asyncio.create_task(self._submit(client, *job)) for job in jobs]
+                for completed, task in enumerate(asyncio.as_completed(tasks), 1):
+                    record = await task
+                    summary[record["status"]] += 1
+                    if record["status"] != "failed":
+                        checkpoint.write(json.dumps(record) + "\n")
+                        checkpoint.flush()
+                    elapsed = time.perf_counter() - started
+                    print(f"[{completed}/{len(jobs)}] {record['key']}: {record['status']} "
+                          f"({completed / elapsed:.1f} entries/s)")
+
+        print(f"Import finished: {dict(summary)}")
+        return summary
+
+    async def _submit(self, client, checkpoint_id, data, page_id):
+        record = {"id": checkpoint_id[0], "entry": checkpoint_id[1], "key": data["key"]}
+        try:
+            if page_id:
+                res = await client.update_page({**data, "notion_page_id": page_id})
+                record["status"] = "updated"
+            else:
+                res = await client.create_page(data)
+                record["status"] = "created"
+        except (ValueError, requests.RequestException) as e:
+            record.update(status="failed", error=str(e))
+            return record
+
+        page_json = res.json()
+        record["page_id"] = page_json.get("id")
+        if self.mirror is not None:
+            self.mirror.upsert(page_json)
+        return record
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a .bib file into the Notion reference database.")
+    parser.add_argument("bib_path")
+    parser.add_argument("--project", action="append", help="Project tag to add (repeatable)")
+    parser.add_argument("--update-existing", action="store_true", help="Update pages whose key already exists")
+    parser.add_argument("--suffix-existing", action="store_true",
+                        help="Import entries whose key already exists under a suffixed key (e.g. Heer2024a)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <bib_path>.checkpoint.jsonl)")
+    args = parser.parse_args()
+
+    BibImporter(args.bib_path, project=args.project, update_existing=args.update_existing,
+                suffix_existing=args.suffix_existing, max_concurrency=args.concurrency,
+                checkpoint_path=args.checkpoint).run()
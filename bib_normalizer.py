@@ -0,0 +1,166 @@
+import argparse
+import logging
+import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from bibtexparser.bparser import BibTexParser
+from authors import AuthorList
+from bibtex_formatter import BibtexFormatter
+from bibtex_stream import iter_entry_texts
+from citation_keys import CitationKeyIndex, sanitize_key
+
+__all__ = ["BibNormalizer"]
+
+logger = logging.getLogger(__name__)
+
+BLOCK_TYPE_PATTERN = re.compile(r'@\s*([A-Za-z]+)')
+VERBATIM_TYPES = ("comment", "preamble", "string")  # Blocks copied to the output unchanged
+
+
+class BibNormalizer:
+    """
+    Normalises a whole .bib file: fields are reordered and their whitespace cleaned
+    (BibtexFormatter.reformat), abstract/eprint are stripped and citation keys are
+    regenerated from the first author and year.
+
+    The file is streamed in chunks of entries which are normalised in a process
+    pool; the output keeps the order of the input. Keys are made unique in that
+    order (Heer2024, Heer2024a, ...) with a CitationKeyIndex; a kept key that is
+    already taken by an earlier entry is suffixed as well and reported.
+    """
+
+    DEFAULT_ORDER = ("author", "title", "year", "journal")
+    DEFAULT_EXCLUDE = ("abstract", "eprint")
+
+    def __init__(self, order=DEFAULT_ORDER, exclude=DEFAULT_EXCLUDE, regenerate_keys=True,
+                 config_path="configs/config.json", processes=None, chunk_size=500):
+        """
+        :param order: Fields written first, in this order.
+        :param exclude: Fields removed from every entry.
+        :param regenerate_keys: Replace the keys by Author.get_citation_key of the first author.
+        :param processes: Size of the process pool; None or 1 normalises in-process.
+        :param chunk_size: Number of entries sent to a worker at once.
+        """
+        self.options = (tuple(order), tuple(exclude), regenerate_keys, config_path)
+        self.processes = processes
+        self.chunk_size = chunk_size
+
+    def normalize_file(self, bib_path, out_path=None):
+        """Normalise bib_path into out_path (stdout if omitted); returns the number of blocks."""
+        out = open(out_path, "w", encoding="utf-8") if out_path else sys.stdout
+        try:
+            count = 0
+            for text in self.normalize_texts(iter_entry_texts(bib_path)):
+                out.write(text)
+                out.write("\n")
+                count += 1
+            return count
+        finally:
+            if out_path:
+                out.close()
+
+    def normalize_texts(self, texts):
+        """Yield the normalised text for every @... block of texts, in the same order."""
+        regenerate_keys = self.options[2]
+        keys = CitationKeyIndex()
+        for text, key, regenerated in self._normalize_blocks(texts):
+            if key is not None and regenerate_keys:
+                # Every key, kept or generated, is reserved in file order, so none is written twice
+                unique_key = keys.reserve(key)
+                if unique_key != key:
+                    if not regenerated:
+                        logger.warning("Key %s is already used by an earlier entry, written as %s", key, unique_key)
+                    text = text.replace("{" + key + ",", "{" + unique_key + ",", 1)
+            yield text
+
+    def _normalize_blocks(self, texts):
+        """(text, key, regenerated) for every block, in order; key is None for verbatim blocks."""
+        chunks = self._chunks(texts)
+        if not self.processes or self.processes < 2:
+            for strings, chunk in chunks:
+                yield from _normalize_chunk(strings, chunk, self.options)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            # Only a few chunks in flight, so memory stays bounded for huge files
+            pending = deque()
+            for strings, chunk in chunks:
+                pending.append(executor.submit(_normalize_chunk, strings, chunk, self.options))
+                if len(pending) >= 2 * self.processes:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def _chunks(self, texts):
+        """Group texts into chunks, each with the @string blocks defined up to its end."""
+        strings = []
+        chunk = []
+        for text in texts:
+            chunk.append(text)
+            if _block_type(text) == "string":
+                strings.append(text)
+            if len(chunk) >= self.chunk_size:
+                yield tuple(strings), chunk
+                chunk = []
+        if chunk:
+            yield tuple(strings), chunk
+
+
+def _block_type(text):
+    match = BLOCK_TYPE_PATTERN.match(text)
+    return match.group(1).lower() if match else ""
+
+
+def _normalize_chunk(strings, texts, options):
+    """
+    Runs in the worker processes: normalise one chunk of @... blocks. Returns
+    (text, key, regenerated) per block; the keys are made unique by the caller.
+    """
+    order, exclude, regenerate_keys, config_path = options
+    parser = BibTexParser()
+    parser.expect_multiple_parse = True
+    database = parser.bib_database
+    for string in strings:  # Make the @string macros known, including those of earlier chunks
+        parser.parse(string, partial=True)
+
+    normalized = []
+    for text in texts:
+        if _block_type(text) in VERBATIM_TYPES:
+            normalized.append((text, None, False))
+            continue
+
+        database.entries.clear()
+        parser.parse(text, partial=True)
+        if not database.entries:  # Unparsable, keep it as it is
+            normalized.append((text, None, False))
+            continue
+
+        entry = database.entries[0]
+        regenerated = False
+        if regenerate_keys and entry.get("author"):
+            first_author = AuthorList(entry["author"], config_path).first_author()
+            key = sanitize_key(first_author.get_citation_key(entry.get("year", "")))
+            if key:
+                entry["ID"] = key
+                regenerated = True
+        text = BibtexFormatter.from_entry(entry, exclude=exclude).reformat(order).rstrip("\n")
+        normalized.append((text, entry.get("ID") or None, regenerated))
+    return normalized
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalise a .bib file: reorder fields, clean whitespace, "
+                                                 "strip abstract/eprint and regenerate citation keys.")
+    parser.add_argument("bib_path")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    parser.add_argument("--processes", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--keep-keys", action="store_true", help="Do not regenerate citation keys")
+    parser.add_argument("--keep-abstract", action="store_true", help="Keep abstract and eprint fields")
+    args = parser.parse_args()
+
+    normalizer = BibNormalizer(exclude=() if args.keep_abstract else BibNormalizer.DEFAULT_EXCLUDE,
+                               regenerate_keys=not args.keep_keys, processes=args.processes,
+                               chunk_size=args.chunk_size)
+    normalizer.normalize_file(args.bib_path, args.output)
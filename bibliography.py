@@ -0,0 +1,106 @@
+from concurrent.futures import ProcessPoolExecutor
+from authors import AuthorList
+from citation_manager import CitationManager
+from output_formatter import *
+
+__all__ = ["Bibliography"]
+
+MISSING_KEY = "missing_id"  # Key of references without ID and authors, as in BibtexFormatter.reduce
+
+class Bibliography:
+    """
+    Renders a whole list of references in one go.
+
+    A single CitationManager is reused for all references, so the style config,
+    the compiled style template, the stopwords and the OutputFormatter are loaded
+    once (once per worker process when rendering in parallel).
+    """
+
+    def __init__(self, references=(), style: str = "APA", output_format="html_css",
+                 config_path: str = "configs/config.json", style_config: str = "formatting_styles.json"):
+        """
+        :param references: Parsed BibTeX entries (bibtexparser entry dicts) and/or NotionPages.
+        :param style: Name of the style in journal_formatting_styles.
+        :param output_format: OutputFormatterFactory key or an OutputFormatter instance.
+        """
+        self.style = style
+        self.output_format = output_format
+        self.config_path = config_path
+        self.style_config = style_config
+        self.entries = []
+        self.extend(references)
+
+    def add(self, reference):
+        self.entries.append(self._to_entry(reference))
+
+    def extend(self, references):
+        for reference in references:
+            self.add(reference)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def sorted_entries(self):
+        """Entries sorted by the first author's sorting key, then year and title."""
+        return sorted(self.entries, key=self._sort_key)
+
+    def render(self, processes: int = None) -> list:
+        """
+        Render all references, sorted, and return the formatted entries.
+        :param processes: Render in a pool of this many worker processes (default: in-process).
+        """
+        entries = self.sorted_entries()
+        options = (self.style, self.output_format, self.config_path, self.style_config)
+        if not processes or processes < 2 or len(entries) < 2:
+            return _render_entries(entries, *options)
+
+        # Contiguous chunks keep the order; one CitationManager per chunk
+        chunk_size = -(-len(entries) // processes)
+        chunks = [entries[i:i + chunk_size] for i in range(0, len(entries), chunk_size)]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            rendered = executor.map(_render_entries, chunks, *([option] * len(chunks) for option in options))
+            return [text for chunk in rendered for text in chunk]
+
+    def render_string(self, separator: str = "\n", processes: int = None) -> str:
+        return separator.join(self.render(processes))
+
+    def _to_entry(self, reference):
+        """Plain entry dict for a reference, so it can be sorted and sent to worker processes."""
+        if isinstance(reference, dict):
+            return dict(reference)
+        # NotionPage: only the fields used by the styles, so the entry stays small to pickle
+        entry = {
+            "ID": reference.key_safe(),
+            "title": reference.title_safe(),
+            "year": str(reference.year_safe()),
+            "journal": reference.journal_safe(),
+            "url": reference.link_doi_safe(),
+        }
+        if reference.authors:
+            entry["author"] = reference.authors.original
+        return {field: value for field, value in entry.items() if value}
+
+    def _sort_key(self, entry):
+        sorting_key = ""
+        if entry.get("author"):
+            first_author = AuthorList(entry["author"], self.config_path).first_author()
+            if first_author:
+                sorting_key = first_author.sorting_key.lower()
+        return sorting_key, entry.get("year", ""), entry.get("title", "").lower()
+
+
+def _render_entries(entries, style, output_format, config_path, style_config):
+    cm = CitationManager(config_path, style_config)
+    if isinstance(output_format, str):
+        output_format = OutputFormatterFactory.get_formatter(output_format)
+    cm.output_formatter = output_format
+    parameters = {"style": style}
+
+    rendered = []
+    for entry in entries:
+        cm.clear_reference()
+        cm.load_entry(entry, short_title=False)  # The styles do not use the short title
+        # Without ID and authors no key can be generated
+        cm.set_citation_key(entry.get("ID") or ("" if cm.authors else MISSING_KEY))
+        rendered.append(cm.process_citation(parameters))
+    return rendered
@@ -1,31 +1,60 @@
 import bibtexparser
-from bibtexparser.bwriter import BibTexWriter
+from bibtexparser.bwriter import BibTexWriter, SortingStrategy
 from bibtexparser.bibdatabase import BibDatabase
 
 __all__ = ["BibtexFormatter"]
 
-# NOTE: BibtexFormatter can currently only handle bibtex-string, does not directly interact with contents from CitationManager - must be changed!
 class BibtexFormatter:
-    def __init__(self, bibtex_string):
-        self.original_bibtex = bibtex_string
-        self.parser = bibtexparser.loads(bibtex_string)
+    """
+    Renders views (original, reformatted, reduced) of parsed BibTeX entries.
+
+    The formatter works directly on a parsed BibDatabase, which can be shared with
+    the caller (e.g. CitationManager), so the BibTeX source is parsed only once.
+    """
+
+    def __init__(self, bibtex_string=None, database=None, exclude=()):
+        """
+        :param bibtex_string: BibTeX source; only parsed if no database is given.
+        :param database: Already parsed BibDatabase. It is not modified, except by set_key.
+        :param exclude: Fields left out of all views, e.g. ("abstract",).
+        """
+        self.database = database if database is not None else bibtexparser.loads(bibtex_string)
+        self.exclude = frozenset(exclude)
+        # The source text is the original view, as long as nothing was excluded or changed
+        self.original_bibtex = bibtex_string if database is None and not self.exclude else None
+
+    @classmethod
+    def from_entry(cls, entry, exclude=()):
+        """Formatter for a single parsed entry, e.g. one yielded by bibtex_stream.iter_entries."""
+        return cls(database=cls._database([entry]), exclude=exclude)
+
+    def entries(self):
+        """The entries without the excluded fields (shallow copies)."""
+        if not self.exclude:
+            return [dict(entry) for entry in self.database.entries]
+        return [{k: v for k, v in entry.items() if k not in self.exclude} for entry in self.database.entries]
+
+    def set_key(self, key):
+        """Rewrite the citation key of the entries."""
+        for entry in self.database.entries:
+            if entry.get("ID"):
+                entry["ID"] = key
+        self.original_bibtex = None
 
     def original(self):
+        if self.original_bibtex is None:
+            self.original_bibtex = bibtexparser.dumps(self._database(self.entries()))
         return self.original_bibtex
 
     def reformat(self, order=["author", "title", "year", "journal"]):
-        # Step 1: Remove empty lines and reduce multiple spaces to one
-        lines = self.original_bibtex.splitlines()
-        cleaned_lines = [" ".join(line.split()) for line in lines if line.strip()]
-        cleaned_bibtex = "\n".join(cleaned_lines)
-
-        # Step 2: Reorder fields based on provided order
-        db = bibtexparser.loads(cleaned_bibtex)
         writer = BibTexWriter()
         writer.indent = '    '
+        writer.display_order_sorting = SortingStrategy.PRESERVE  # Keep the order built below
         reordered_entries = []
 
-        for entry in db.entries:
+        for entry in self.entries():
+            # Remove empty lines and reduce multiple spaces to one
+            entry = {k: _clean_value(v) for k, v in entry.items()}
             reordered_entry = {}
 
             # Add fields based on the provided order
@@ -37,23 +66,18 @@ class BibtexFormatter:
             reordered_entry.update(entry)
             reordered_entries.append(reordered_entry)
 
-        # Create a new database and write the reordered entries
-        new_db = BibDatabase()
-        new_db.entries = reordered_entries
-
-        return writer.write(new_db)
+        return writer.write(self._database(reordered_entries))
 
     reformatted = reformat
 
     def reduce(self, fields=["author", "title", "journal", "year"]):
-        db = self.parser
         reduced_entries = []
 
-        for entry in db.entries:
+        for entry in self.database.entries:
             # Always keep 'ENTRYTYPE' and 'ID', and include fields that are non-empty
             reduced_entry = {
                 k: v for k, v in entry.items()
-                if k in fields and v.strip()
+                if k in fields and k not in self.exclude and v.strip()
             }
 
             # Ensure ENTRYTYPE and ID are preserved
@@ -62,13 +86,20 @@ class BibtexFormatter:
 
             reduced_entries.append(reduced_entry)
 
-        # Create a new database and write the reduced entries
-        new_db = BibDatabase()
-        new_db.entries = reduced_entries
-
         writer = BibTexWriter()
         writer.indent = '    '
 
-        return writer.write(new_db)
+        return writer.write(self._database(reduced_entries))
 
     reduced = reduce
+
+    @staticmethod
+    def _database(entries):
+        db = BibDatabase()
+        db.entries = entries
+        return db
+
+
+def _clean_value(value):
+    lines = value.splitlines()
+    return "\n".join(" ".join(line.split()) for line in lines if line.strip())
@@ -0,0 +1,79 @@
+import mmap
+import re
+from bibtexparser.bparser import BibTexParser
+
+__all__ = ["iter_entry_texts", "iter_entries"]
+
+# Start of an entry: @type{ or @type(
+ENTRY_START_PATTERN = re.compile(rb'@[ \t]*([A-Za-z]+)[ \t\r\n]*([{(])')
+DELIMITER_PATTERN = re.compile(rb'[{}()"]')
+RELEASE_CHUNK = 16 * 1024 * 1024  # Hand pages of the mapping back to the OS after this many bytes
+
+
+def iter_entry_texts(path, encoding="utf-8"):
+    """
+    Yield the source text of every @... block (entries, @string, @preamble, @comment)
+    of a .bib file. The file is memory-mapped and scanned for the matching closing
+    delimiter, so only one entry at a time is held in memory.
+    """
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            return
+        with mm:
+            pos = released = 0
+            while True:
+                start = mm.find(b"@", pos)
+                if start < 0:
+                    return
+                match = ENTRY_START_PATTERN.match(mm, start)
+                if match is None:  # A stray @ in text between entries
+                    pos = start + 1
+                    continue
+                end = _find_entry_end(mm, match.end(), match.group(2))
+                yield mm[start:end].decode(encoding, errors="replace")
+                pos = end
+                if pos - released >= RELEASE_CHUNK and hasattr(mmap, "MADV_DONTNEED"):
+                    # Already read pages still count towards the RSS otherwise
+                    boundary = pos - pos % mmap.PAGESIZE
+                    mm.madvise(mmap.MADV_DONTNEED, released, boundary - released)
+                    released = boundary
+
+
+def iter_entries(path, encoding="utf-8"):
+    """
+    Yield the parsed entries of a .bib file one by one, as the dicts bibtexparser
+    produces. @string macros defined earlier in the file are resolved, memory use
+    does not depend on the size of the file.
+    """
+    parser = BibTexParser()
+    parser.expect_multiple_parse = True
+    database = parser.bib_database
+    for text in iter_entry_texts(path, encoding):
+        parser.parse(text, partial=True)
+        yield from database.entries
+        # Drop everything but the @string macros, so the parser does not accumulate the file
+        database.entries.clear()
+        database.comments.clear()
+        database.preambles.clear()
+
+
+def _find_entry_end(mm, pos, opening):
+    """Position after the delimiter closing the entry that was opened right before pos."""
+    depth = 0
+    in_quotes = False  # Only tracked at brace depth 0, where a quoted value may contain ")"
+    for match in DELIMITER_PATTERN.finditer(mm, pos):
+        char = match.group()
+        if char == b'"':
+            if depth == 0:
+                in_quotes = not in_quotes
+        elif char == b"{":
+            depth += 1
+        elif char == b"}":
+            if depth == 0 and opening == b"{":
+                return match.end()
+            depth -= 1
+        elif char == b")" and depth == 0 and not in_quotes and opening == b"(":
+            return match.end()
+    return len(mm)  # Unterminated entry: the rest of the file
@@ -0,0 +1,104 @@
+import re
+import threading
+from string import ascii_lowercase
+from unidecode import unidecode
+
+__all__ = ["CitationKeyIndex", "sanitize_key"]
+
+KEY_INVALID_PATTERN = re.compile(r'[^A-Za-z0-9]')
+
+class CitationKeyIndex:
+    """
+    In-memory set of the citation keys in use, for O(1) availability checks.
+
+    When a generated key like 'Heer2024' is taken, the index proposes the next free
+    suffixed key ('Heer2024a', 'Heer2024b', ..., 'Heer2024z', 'Heer2024aa', ...).
+    Keys reserved for a batch of new entries count as taken, so entries within one
+    batch never get the same key.
+    """
+
+    def __init__(self, keys=()):
+        self._keys = set(key for key in keys if key)
+        self._next_suffix = {}  # base key -> index of the first suffix that may still be free
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_mirror(cls, mirror):
+        """Build the index from the keys stored in a NotionMirror."""
+        return cls(mirror.key_map())
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def is_available(self, key):
+        return key not in self._keys
+
+    def add(self, key):
+        if key:
+            with self._lock:
+                self._keys.add(key)
+
+    def update(self, keys):
+        with self._lock:
+            self._keys.update(key for key in keys if key)
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self._next_suffix.clear()
+
+    def discard(self, key):
+        with self._lock:
+            self._keys.discard(key)
+            # A freed suffix may be proposed again
+            for base in [base for base in self._next_suffix if key != base and key.startswith(base)]:
+                del self._next_suffix[base]
+
+    def propose(self, base):
+        """Return base if it is free, otherwise the first free suffixed key. Reserves nothing."""
+        with self._lock:
+            return self._propose(base)
+
+    def reserve(self, base):
+        """Like propose, but marks the returned key as taken."""
+        with self._lock:
+            key = self._propose(base)
+            self._keys.add(key)
+            return key
+
+    def reserve_batch(self, bases):
+        """Reserve a key for every base key, in order; colliding entries get consecutive suffixes."""
+        with self._lock:
+            keys = []
+            for base in bases:
+                key = self._propose(base)
+                self._keys.add(key)
+                keys.append(key)
+            return keys
+
+    def _propose(self, base):
+        if base not in self._keys:
+            return base
+        index = self._next_suffix.get(base, 0)
+        while base + suffix(index) in self._keys:
+            index += 1
+        self._next_suffix[base] = index
+        return base + suffix(index)
+
+
+def sanitize_key(key):
+    """Key usable in BibTeX and Notion: LaTeX accents and non-ASCII letters reduced to ASCII letters and digits."""
+    return KEY_INVALID_PATTERN.sub("", unidecode(key))
+
+
+def suffix(index):
+    """0 -> 'a', 25 -> 'z', 26 -> 'aa', 27 -> 'ab', ..."""
+    letters = ""
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = ascii_lowercase[rest] + letters
+    return letters
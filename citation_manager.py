@@ -1,24 +1,40 @@
 import json
+import logging
 import re
 import bibtexparser
 from authors import Author, AuthorList
 from config_handler import *
 from bibtex_formatter import *
 from output_formatter import *
+from citation_template import compile_template
 from collections import Counter
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from functools import lru_cache
 
 __all__ = ["CitationManager"]
 
+logger = logging.getLogger(__name__)
+
+# Regex tokenizer used instead of NLTK's word_tokenize for bulk work or without the punkt model
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]+")
+
 class CitationManager:
     def __init__(self, config_path: str = "configs/config.json", style_config: str = "formatting_styles.json"):
+        self.config_path = config_path
+        self.style_config_path = style_config
+        self.style_config_data = ConfigHandler.load_config(self.style_config_path)
+        self.output_formatter = HtmlCssFormatter()
+        self.key_index = None  # Optional CitationKeyIndex, generated keys then avoid taken keys
+        self.clear_reference()
+
+    def clear_reference(self):
+        """Reset all per-reference fields, so the instance can be reused for the next reference."""
         self.original_bibtex_file = ""
         self.modified_bibtex_file = ""
         self.original_bibtex_key = ""
         self.bibtex_url = ""
         self.bibtex_authors = ""
         self.bibtex_doi = ""
+        self.link_doi = ""
         self.year = ""
         #self.title = ""
         self.journal = ""
@@ -26,9 +42,6 @@ class CitationManager:
         self.venue = ""
         self.authors = None
         self.bibtex_data = None
-        self.config_path = config_path
-        self.style_config_path = style_config
-        self.style_config_data = ConfigHandler.load_config(self.style_config_path)
         self.citation_key = ""
         self.papertrail = ""
         self.projects = []
@@ -36,16 +49,14 @@ class CitationManager:
         self.type = ""
         self.notes = ""
         self.bibtex_formatter = None
-        self.output_formatter = HtmlCssFormatter()
         self._title = "" #self.title
         self._short_title_length = None  # Default short title length
-        self._short_title = None  # Default short title    def __init__(self, title: str):
+        self._short_title = None  # Default short title
         self._short_title_set_manually = False
 
-        self.stopwords = set(stopwords.words('english'))  # Load stopwords
-
 
     key = property(lambda self: self.citation_key)
+    stopwords = property(lambda self: english_stopwords())  # Loaded on first use, shared by all instances
     cite_count = property(lambda self: self.count)
 
     @property
@@ -88,59 +99,60 @@ class CitationManager:
         self.bibtex_data = bibtexparser.loads(bibtex)
 
         for entry in self.bibtex_data.entries:
-            if "ID" in entry:
-                self.original_bibtex_key = entry["ID"]
-            if "year" in entry:
-                self.year = entry["year"]
-            if "title" in entry:
-                self.title = entry["title"]
-            if "journal" in entry:
-                self.journal = entry["journal"]
-            elif "booktitle" in entry:
-                self.journal = entry["booktitle"]
-            if "abstract" in entry:
-                self.abstract = entry["abstract"]
-                del entry["abstract"]
-            if "url" in entry:
-                self.bibtex_url = entry["url"].strip()
-            if "author" in entry:
-                self.bibtex_authors = entry["author"]
-                self.authors = AuthorList(entry["author"], self.config_path)
-            if "doi" in entry:
-                self.bibtex_doi = entry["doi"].strip()
-            if "eprint" in entry:
-                del entry["eprint"]
+            self.load_entry(entry)
 
         self.bibtex_data.entries[0]["ID"] = self.get_citation_key()
 
+        # The formatter shares the parsed entries, the abstract is kept in its own field
+        self.bibtex_formatter = BibtexFormatter(database=self.bibtex_data, exclude=("abstract", "eprint"))
+        self.modified_bibtex_file = self.bibtex_formatter.original()
+
+    def load_entry(self, entry: dict, short_title: bool = True):
+        """
+        Take over the fields of one parsed BibTeX entry (a bibtexparser entry dict).
+        Fields missing in the entry keep their current value, see clear_reference.
+        :param short_title: Also create the short title; bulk callers that do not use it skip the tokenizer.
+        """
+        if "ID" in entry:
+            self.original_bibtex_key = entry["ID"]
+        if "year" in entry:
+            self.year = entry["year"]
+        if "title" in entry:
+            if short_title:
+                self.title = entry["title"]
+            else:
+                self._title = entry["title"]
+        if "journal" in entry:
+            self.journal = entry["journal"]
+        elif "booktitle" in entry:
+            self.journal = entry["booktitle"]
+        if "abstract" in entry:
+            self.abstract = entry["abstract"]
+        if "url" in entry:
+            self.bibtex_url = entry["url"].strip()
+        if "author" in entry:
+            self.bibtex_authors = entry["author"]
+            self.authors = AuthorList(entry["author"], self.config_path)
+        if "doi" in entry:
+            self.bibtex_doi = entry["doi"].strip()
+
         self.match_venue()
         self.set_link_doi()
-        self.modified_bibtex_file = bibtexparser.dumps(self.bibtex_data)
-        self.bibtex_formatter = BibtexFormatter(self.modified_bibtex_file)
 
     def set_link_doi(self):
-        if self.bibtex_url:
-            self.link_doi = self.bibtex_url
-        elif self.bibtex_doi:
-            match = re.search(r"(?:doi\\.org/|^/)(.+)", self.bibtex_doi)
-            if match:
-                self.link_doi = "https://doi.org/" + match.group(1)
-            else:
-                self.link_doi = "https://doi.org/" + self.bibtex_doi
+        link = doi_link(self.bibtex_url, self.bibtex_doi)
+        if link:
+            self.link_doi = link
 
     def match_venue(self):
-        if not self.venue:
-            return
-        config_data = ConfigHandler.load_config(self.config_path)
-        for mapping in config_data.get("venue_mapping", []):
-            pattern = mapping.get("regex", "")
-            if pattern and re.search(pattern, self.journal):
-                self.venue = mapping.get("venue-mapping", "")
-                return
+        venue = venue_for_journal(self.journal, self.config_path)
+        if venue:
+            self.venue = venue
 
     def generate_citation_key(self):
         fa = self.authors.first_author()
-        self.citation_key = fa.get_citation_key(self.year)
+        key = fa.get_citation_key(self.year)
+        self.citation_key = self.key_index.propose(key) if self.key_index is not None else key
         return self.citation_key
 
     def set_citation_key(self, key):
@@ -156,34 +168,12 @@ class CitationManager:
 
         min_words = kwargs.get('min_words', 4)
         max_words = kwargs.get('max_words', 5)
+        fast = kwargs.get('fast', False)  # Regex tokenizer instead of NLTK
 
-        # Handle colons and dashes (prefer first part)
-        title = re.split(r'[:\-]', self._title)[0].strip()
-
-        # Tokenize and filter stopwords
-        words = word_tokenize(title)
-        content_words = [w for w in words if w.lower() not in self.stopwords and w.isalnum()]
-
-        # Keep acronyms and capitalized words
-        important_words = [w for w in content_words if w.istitle() or w.isupper()]
-        if len(important_words) < min_words:
-            important_words = content_words  # Fall back to all content words
-
-        # Determine length based on title length
-        title_length = len(title)
-        if title_length <= 6:
-            short_title = title  # Keep full title if 6 words or fewer
-        else:
-            dynamic_length = max(min_words, min(max_words, title_length // 2))
-            short_title = important_words[:dynamic_length]
-
-        if fixed_length is not None:
-            short_title = important_words[:fixed_length]
-        else:
-            short_title = important_words[:dynamic_length]
-
-        if short_title:
-            short_title[0] = short_title[0].capitalize()
+        title = _short_title_source(self._title)
+        words = tokenize(title, fast=fast)
+        flags = [_word_flags(word, self.stopwords) for word in words]
+        short_title = _select_short_title(title, words, flags, fixed_length, min_words, max_words)
 
         self._short_title = ' '.join(short_title)
         self._short_title_length = len(short_title)
@@ -191,22 +181,53 @@ class CitationManager:
         return self._short_title
 
 
+    @staticmethod
+    def create_short_titles(titles, manual=None, fixed_length: int = None, **kwargs) -> list:
+        """
+        Short titles for many titles at once, e.g. to back-fill a whole library. Gives
+        the same result as create_short_title for each title, but every distinct word is
+        classified against the stopwords only once for the whole batch.
+        :param titles: The full titles.
+        :param manual: Optional short titles set by hand, parallel to titles. Non-empty
+            entries are returned unchanged.
+        :param fast: Use the regex tokenizer instead of NLTK (default True).
+        """
+        min_words = kwargs.get('min_words', 4)
+        max_words = kwargs.get('max_words', 5)
+        fast = kwargs.get('fast', True)
+        stop = english_stopwords()
+        vocabulary = {}  # word -> flags
+
+        short_titles = []
+        for i, full_title in enumerate(titles):
+            if manual is not None and manual[i]:
+                short_titles.append(manual[i])
+                continue
+            title = _short_title_source(full_title or "")
+            words = tokenize(title, fast=fast)
+            flags = []
+            for word in words:
+                flag = vocabulary.get(word)
+                if flag is None:
+                    flag = vocabulary[word] = _word_flags(word, stop)
+                flags.append(flag)
+            short_titles.append(' '.join(_select_short_title(title, words, flags, fixed_length, min_words, max_words)))
+        return short_titles
+
     def get(self, key, *args, **kwargs):
-        print(f"Resolving {key} with args={args} and kwargs={kwargs}")
+        logger.debug("Resolving %s with args=%s and kwargs=%s", key, args, kwargs)
         if '.' in key:
             obj, method = key.split('.', 1)
-            print(f"Object: {obj}, Method: {method}")
 
             obj_ref = getattr(self, obj, None)
             if obj_ref:
-                print(f"Found object: {obj_ref}")
                 if hasattr(obj_ref, method):
-                    print(f"Calling method: {method} on {obj}")
+                    logger.debug("Calling method %s on %s", method, obj)
                     return getattr(obj_ref, method)(*args, **kwargs)
                 else:
-                    print(f"Method {method} not found on {obj}")
+                    logger.debug("Method %s not found on %s", method, obj)
             else:
-                print(f"Object {obj} not found in CitationManager")
+                logger.debug("Object %s not found in CitationManager", obj)
 
         formatter = kwargs.get("formatter", None)
         if formatter:
@@ -216,7 +237,7 @@ class CitationManager:
             return value
         else:
             value = getattr(self, key, '')
-            print(f"Returning direct attribute: {value}")
+            logger.debug("Returning direct attribute %s = %r", key, value)
             return value
 
     def select_style_template(self, parameters: dict) -> str:
@@ -231,61 +252,112 @@ class CitationManager:
         return template
 
     def process_citation(self, parameters: dict):
-        print("CALLED PROCESS_CITATION")
-        template_str = self.select_style_template(parameters)
-
-        def replace_conditionals(text):
-            pattern = re.compile(r'\{\{(.*?)((?:##.*?##|\{\{.*?\}\})+)(.*?)\}\}', re.DOTALL)
-
-            def conditional_replacer(match):
-                prefix = match.group(1)
-                content = match.group(2)
-                suffix = match.group(3)
-
-                markers = re.findall(r'##(.*?)##', content)
-
-                if all(self.get(marker.strip(), formatter=self.output_formatter) for marker in markers):
-                    content = replace_conditionals(content)
-                    for marker in markers:
-                        content = content.replace(f'##{marker}##', self.get(marker.strip(), formatter=self.output_formatter))
-                    return f"{prefix}{content}{suffix}"
-                return ''
-
-            return pattern.sub(conditional_replacer, text)
-
-        def replace_variables(text):
-            pattern = re.compile(r'##(.*?)##')
+        logger.debug("process_citation with %s", parameters)
+        template = compile_template(self.select_style_template(parameters))
+        text = template.render(lambda key: self.get(key, formatter=self.output_formatter))
 
-            def variable_replacer(match):
-                key = match.group(1).strip()
-                return self.get(key, formatter=self.output_formatter)
-
-            return pattern.sub(variable_replacer, text)
-
-        def postprocess(text):
-            # Check for final marker {{{.}}} and extract the desired final symbol
-            final_marker_match = re.search(r'\{\{\{(.*?)\}\}\}$', text)
-            final_symbol = final_marker_match.group(1) if final_marker_match else ''
-
-            # Remove final marker from the text
-            text = re.sub(r'\{\{\{.*?\}\}\}$', '', text)
-
-            # Replace trailing non-alphanumeric characters, preserving ), ], >
-            text = re.sub(r'([^\w\)\]\>]+)$', '', text)
-
-            # Append the final symbol if it exists
-            if final_symbol:
-                if text.endswith((')', ']', '>')):
-                    text = text[:-1] + final_symbol + text[-1]
-                else:
-                    text += final_symbol
-
-            if self.output_formatter:
-                return self.output_formatter.format_final_entry(text, id=self.get_citation_key())
-            else:
-                return text
-
-        processed = replace_conditionals(template_str)
-        processed = replace_variables(processed)
-        processed = postprocess(processed)
-        return processed
+        if self.output_formatter:
+            return self.output_formatter.format_final_entry(text, id=self.get_citation_key())
+        else:
+            return text
+
+
+# Word classes used for short titles
+CONTENT_WORD = 1
+IMPORTANT_WORD = 2  # Capitalized word or acronym
+
+
+def venue_for_journal(journal: str, config_path: str = "configs/config.json") -> str:
+    """The venue of the first venue_mapping regex matching the journal (case-insensitive), or ""."""
+    if not journal:
+        return ""
+    venue_patterns = ConfigHandler.load_derived(config_path, "venue_patterns", lambda config: [
+        (re.compile(mapping["regex"], re.IGNORECASE), mapping.get("venue-mapping", ""))
+        for mapping in config.get("venue_mapping", []) if mapping.get("regex")
+    ])
+    for pattern, venue in venue_patterns:
+        if pattern.search(journal):
+            return venue
+    return ""
+
+
+def doi_link(url: str, doi: str) -> str:
+    """Link of a reference: its URL, otherwise its DOI as https://doi.org/ link, or ""."""
+    if url:
+        return url.strip()
+    if doi:
+        doi = doi.strip()
+        match = re.search(r"(?:doi\.org/|^/)(.+)", doi)
+        return "https://doi.org/" + (match.group(1) if match else doi)
+    return ""
+
+
+def _short_title_source(title):
+    """The part of the title short titles are built from: everything before a colon or dash."""
+    return re.split(r'[:\-]', title)[0].strip()
+
+
+def _word_flags(word, stop):
+    if not word.isalnum() or word.lower() in stop:
+        return 0
+    if word.istitle() or word.isupper():
+        return CONTENT_WORD | IMPORTANT_WORD
+    return CONTENT_WORD
+
+
+def _select_short_title(title, words, flags, fixed_length, min_words, max_words):
+    """Pick the words of the short title from the tokenized title and the flags of each word."""
+    content_words = [word for word, flag in zip(words, flags) if flag]
+
+    # Keep acronyms and capitalized words
+    important_words = [word for word, flag in zip(words, flags) if flag & IMPORTANT_WORD]
+    if len(important_words) < min_words:
+        important_words = content_words  # Fall back to all content words
+
+    # Determine length based on title length
+    if fixed_length is not None:
+        length = fixed_length
+    elif len(title) <= 6:
+        length = max_words  # Very short title: keep all of it
+    else:
+        length = max(min_words, min(max_words, len(title) // 2))
+
+    short_title = important_words[:length]
+    if short_title:
+        short_title[0] = short_title[0].capitalize()
+    return short_title
+
+
+@lru_cache(maxsize=None)
+def english_stopwords() -> frozenset:
+    """NLTK's English stopwords, loaded once per process on first use."""
+    try:
+        from nltk.corpus import stopwords
+        return frozenset(stopwords.words('english'))
+    except (ImportError, LookupError) as e:
+        logger.warning("NLTK stopwords unavailable, short titles keep all words: %s", e)
+        return frozenset()
+
+
+def tokenize(text: str, fast: bool = False) -> list:
+    """
+    Split text into word and punctuation tokens.
+    :param fast: Use the regex tokenizer instead of NLTK's word_tokenize.
+    """
+    if not fast:
+        word_tokenize = _nltk_tokenizer()
+        if word_tokenize is not None:
+            return word_tokenize(text)
+    return TOKEN_PATTERN.findall(text)
+
+
+@lru_cache(maxsize=None)
+def _nltk_tokenizer():
+    """NLTK's word_tokenize, or None if NLTK or its punkt model is not installed."""
+    try:
+        from nltk.tokenize import word_tokenize
+        word_tokenize("probe")  # Loads the punkt model, raises LookupError if it is missing
+    except (ImportError, LookupError) as e:
+        logger.warning("NLTK tokenizer unavailable, using the regex tokenizer: %s", e)
+        return None
+    return word_tokenize
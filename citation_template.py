@@ -0,0 +1,114 @@
+import re
+from functools import lru_cache
+
+__all__ = ["CitationTemplate", "compile_template"]
+
+# Template syntax (see journal_formatting_styles in formatting_styles.json):
+#   ##key##            variable, resolved through CitationManager.get
+#   {{prefix##key##suffix}}  conditional, rendered only if all keys inside have a value
+#   {{{.}}}            final marker at the very end: symbol placed at the end of the entry
+CONDITIONAL_PATTERN = re.compile(r'\{\{(.*?)((?:##.*?##|\{\{.*?\}\})+)(.*?)\}\}', re.DOTALL)
+VARIABLE_PATTERN = re.compile(r'##(.*?)##')
+FINAL_MARKER_PATTERN = re.compile(r'\{\{\{(.*?)\}\}\}$')
+TRAILING_PATTERN = re.compile(r'([^\w\)\]\>]+)$')
+
+
+class CitationTemplate:
+    """
+    A citation template compiled once into a plan of closures. Rendering walks the
+    plan in a single pass and resolves every field at most once.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self.final_symbol = ''
+
+        body = template
+        final_marker = FINAL_MARKER_PATTERN.search(template)
+        conditionals_end = max((m.end() for m in CONDITIONAL_PATTERN.finditer(template)), default=0)
+        if final_marker and final_marker.start() >= conditionals_end:
+            self.final_symbol = final_marker.group(1)
+            body = template[:final_marker.start()]
+
+        self._parts = _compile(body)
+
+    def render(self, resolve) -> str:
+        """
+        Render the template.
+        :param resolve: Callable returning the (formatted) value for a key.
+        """
+        values = {}
+
+        def value(key):
+            if key not in values:
+                values[key] = resolve(key)
+            return values[key]
+
+        text = "".join(part(value) for part in self._parts)
+
+        # Replace trailing non-alphanumeric characters, preserving ), ], >
+        text = TRAILING_PATTERN.sub('', text)
+
+        # Append the final symbol if it exists
+        if self.final_symbol:
+            if text.endswith((')', ']', '>')):
+                text = text[:-1] + self.final_symbol + text[-1]
+            else:
+                text += self.final_symbol
+        return text
+
+    def __repr__(self):
+        return f"CitationTemplate({self.template!r})"
+
+
+@lru_cache(maxsize=256)
+def compile_template(template: str) -> CitationTemplate:
+    """Return the compiled template, compiling each distinct template string only once."""
+    return CitationTemplate(template)
+
+
+def _compile(text):
+    """Compile template text into a list of callables taking the value lookup."""
+    parts = []
+    pos = 0
+    for match in CONDITIONAL_PATTERN.finditer(text):
+        parts.extend(_compile_variables(text[pos:match.start()]))
+        prefix, content, suffix = match.groups()
+        markers = tuple(marker.strip() for marker in VARIABLE_PATTERN.findall(content))
+        children = _compile_variables(prefix) + _compile(content) + _compile_variables(suffix)
+        parts.append(_conditional(markers, children))
+        pos = match.end()
+    parts.extend(_compile_variables(text[pos:]))
+    return parts
+
+
+def _compile_variables(text):
+    parts = []
+    pos = 0
+    for match in VARIABLE_PATTERN.finditer(text):
+        if match.start() > pos:
+            parts.append(_literal(text[pos:match.start()]))
+        parts.append(_variable(match.group(1).strip()))
+        pos = match.end()
+    if pos < len(text):
+        parts.append(_literal(text[pos:]))
+    return parts
+
+
+def _literal(text):
+    return lambda value: text
+
+
+def _variable(key):
+    def render(value):
+        result = value(key)
+        return "" if result is None else str(result)
+    return render
+
+
+def _conditional(markers, children):
+    def render(value):
+        if all(value(key) for key in markers):
+            return "".join(child(value) for child in children)
+        return ""
+    return render
@@ -112,6 +112,7 @@ class ConfigEditor(tk.Toplevel):
 
             with open(self.config_path, "w", encoding="utf-8") as file:
                 json.dump(parsed_json, file, indent=4)
+            ConfigHandler.invalidate(self.config_path)
 
             self.last_saved_state = json_data  # Update last saved state
             messagebox.showinfo("Success", f"Config file '{os.path.basename(self.config_path)}' saved successfully!")
@@ -1,12 +1,29 @@
 import json
+import logging
 import os
+import threading
+import time
 
 __all__ = ["ConfigHandler"]
 
+logger = logging.getLogger(__name__)
+
 class ConfigHandler:
-    """A utility class for loading JSON configuration files."""
+    """
+    A utility class for loading JSON configuration files.
+
+    Loaded files are cached for the whole process and only re-read when their
+    modification time or size changes. The file is stat'ed at most once per
+    CHECK_INTERVAL, so repeated lookups in hot paths (e.g. one per Author) cost
+    no file I/O at all.
+    """
 
     CONFIG_DIR = "configs"
+    CHECK_INTERVAL = 1.0  # Seconds between two checks of a cached file for changes
+
+    _cache = {}  # absolute path -> _CachedConfig
+    _paths = {}  # file name as passed by the caller -> (path, absolute path)
+    _lock = threading.Lock()
 
     @staticmethod
     def get_full_path(file_name: str) -> str:
@@ -18,20 +35,90 @@ class ConfigHandler:
             return file_name
         return os.path.join(ConfigHandler.CONFIG_DIR, file_name)
 
-    @staticmethod
-    def load_config(file_name: str) -> dict:
+    @classmethod
+    def load_config(cls, file_name: str) -> dict:
         """
         Load and return JSON configuration data. Automatically looks in the 'configs/'
         directory if only a filename is provided.
+        The returned dict is shared between all callers and must not be modified.
+        """
+        return cls._get(file_name).data
+
+    @classmethod
+    def load_derived(cls, file_name: str, name: str, build) -> object:
+        """
+        Return build(config) for a configuration file, computed once per version of
+        the file. Used for values derived from the config, e.g. sets or compiled regexes.
         """
-        file_path = ConfigHandler.get_full_path(file_name)
+        entry = cls._get(file_name)
+        if name not in entry.derived:
+            entry.derived[name] = build(entry.data)
+        return entry.derived[name]
+
+    @classmethod
+    def invalidate(cls, file_name: str = None):
+        """Drop one (or every) cached file, e.g. right after writing it."""
+        with cls._lock:
+            if file_name is None:
+                cls._cache.clear()
+            else:
+                cls._cache.pop(cls._resolve(file_name)[1], None)
+
+    @classmethod
+    def _resolve(cls, file_name):
+        # Resolving paths costs more than a cache hit, so it is done once per file name
+        paths = cls._paths.get(file_name)
+        if paths is None:
+            file_path = cls.get_full_path(file_name)
+            paths = cls._paths[file_name] = (file_path, os.path.abspath(file_path))
+        return paths
+
+    @classmethod
+    def _get(cls, file_name):
+        file_path, key = cls._resolve(file_name)
+        now = time.monotonic()
+        with cls._lock:
+            entry = cls._cache.get(key)
+            if entry is not None and now - entry.checked < cls.CHECK_INTERVAL:
+                return entry
+
+        stamp = cls._stamp(file_path)
+        with cls._lock:
+            entry = cls._cache.get(key)
+            if entry is not None and entry.stamp == stamp:
+                entry.checked = now
+                return entry
+
+        entry = _CachedConfig(stamp, cls._read(file_path), now)
+        with cls._lock:
+            cls._cache[key] = entry
+        return entry
+
+    @staticmethod
+    def _stamp(file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _read(file_path):
         try:
             with open(file_path, 'r') as file:
                 data = json.load(file)
-                print(f"Loaded JSON data: {data}")
+                logger.debug("Loaded JSON data from %s: %s", file_path, data)
                 return data
         except FileNotFoundError:
-            print(f"Error: {file_path} not found.")
+            logger.error("%s not found.", file_path)
         except json.JSONDecodeError:
-            print(f"Error: Invalid JSON in {file_path}.")
+            logger.error("Invalid JSON in %s.", file_path)
         return {}
+
+
+class _CachedConfig:
+    def __init__(self, stamp, data, checked):
+        self.stamp = stamp
+        self.data = data
+        self.checked = checked
+        self.derived = {}
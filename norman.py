@@ -3,6 +3,7 @@ from tkinter import ttk, filedialog, messagebox
 import tkinter.font as tkFont
 import re
 #import notion_paper
+import logging
 import os, sys
 import shutil
 import subprocess
@@ -11,13 +12,19 @@ import bibtexparser
 import json
 import webbrowser
 from notion import NotionAPI, NotionPage
+from notion_mirror import NotionMirror
+from notion_updates import NotionUpdateQueue
+from background_worker import BackgroundWorker
 from config_editor import ConfigEditor
 from pdf_handler import PdfHandler
-from citation_manager import CitationManager
+from citation_manager import CitationManager, venue_for_journal
+from bibtex_formatter import BibtexFormatter
 
 
 # Define the main application class
 class MainApp(tk.Tk):
+    MIRROR_SYNC_INTERVAL = 60_000  # milliseconds between delta syncs of the Notion mirror
+
     def __init__(self):
         super().__init__()
 
@@ -28,6 +35,11 @@ class MainApp(tk.Tk):
         self.config_path = "configs/config.json"
         self.config_data = self.load_config(self.config_path)
         self.notion_api = NotionAPI()
+        self.notion_mirror = NotionMirror(self.notion_api)
+        self.worker = BackgroundWorker(self)
+        self.notion_updates = NotionUpdateQueue(self, self.worker, self.notion_api, self.notion_mirror)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.sync_mirror()
 
         # Create a main container to hold everything
         main_container = tk.Frame(self)
@@ -93,6 +105,31 @@ class MainApp(tk.Tk):
     def open_window_list_view(self):
         WindowListView(self)
 
+    def on_close(self):
+        # Queued edits are only sent by after() timers, which end with the main loop
+        self.notion_updates.flush()
+        self.notion_updates.wait()  # Only the updates, a running mirror sync does not hold up closing
+        self.notion_updates.drain()
+        self.worker.shutdown()  # Drops queued jobs such as the next mirror sync
+        self.destroy()
+
+    def sync_mirror(self):
+        """
+        Refresh the local Notion mirror in the background (delta only, after the first
+        run) and again every MIRROR_SYNC_INTERVAL, so keys created elsewhere during a
+        session are known. The next sync is scheduled once this one finished.
+        """
+        self.worker.submit(self.notion_mirror.delta_sync,
+                           on_success=lambda stats: self.schedule_mirror_sync(),
+                           on_error=self.on_mirror_sync_failed)
+
+    def schedule_mirror_sync(self):
+        self.after(self.MIRROR_SYNC_INTERVAL, self.sync_mirror)
+
+    def on_mirror_sync_failed(self, error):
+        print(f"Mirror sync failed: {error!r}")
+        self.schedule_mirror_sync()
+
 
     def toggle_options(self):
         """Toggle the visibility of the options frame."""
@@ -242,11 +279,13 @@ class HierarchyWindow(tk.Toplevel):
         main_app.total_descendant_count += 1
         self.inherit_projects()
         self.authors = []
-        self.notion_page_id = []
+        self.notion_page_id = None
+        self.notion_page = None  # Page as last loaded/sent, tracks the fields edited since
         self.sent_to_notion = False
         self.loaded_from_notion = False
         self.pdf_handler = PdfHandler(main_app.config_data["papers_path"])
         self.cm = CitationManager(main_app.config_path)
+        self.cm.key_index = main_app.notion_mirror.key_index()  # Propose free keys without asking Notion
 
         # Bind the destroy event to your custom close logic
         self.protocol("WM_DELETE_WINDOW", self.close_window)
@@ -577,6 +616,7 @@ class HierarchyWindow(tk.Toplevel):
         self.go_to_surface_button.grid(row=101, column=2, padx= 5, pady=5, sticky="W")
 
         self.parsed_bibtex = 0
+        self.displayed_bibtex = ""  # Text last rendered into bibtex_field by format_bibtex
         self.bibtex_url = ""
         self.bibtex_doi = ""
         self.is_waiting = False
@@ -717,17 +757,11 @@ class HierarchyWindow(tk.Toplevel):
         self.cm.set_citation_key(self.key_var.get())
         self.cm.parse_bibtex(bibtex)
         self.key_var.set(self.cm.get_citation_key())
-        bib_data = bibtexparser.loads(bibtex)
-        for entry in bib_data.entries:
+        for entry in self.cm.bibtex_data.entries:  # Parsed once, shared with the CitationManager
             pprint.pprint(f"Entry: {entry}")
             self.year_var.set(entry["year"]) if "year" in entry else None
-            if entry['ID'] and self.key_entry.get():
-                entry['ID'] = self.key_entry.get()
-            if "eprint" in entry:
-                del entry["eprint"]
             if "abstract" in entry:
                 self.abstract_field.insert("1.0", entry["abstract"])
-                del entry["abstract"]
             if "url" in entry:
                 self.bibtex_url = entry["url"].strip()
             if "author" in entry:
@@ -751,14 +785,15 @@ class HierarchyWindow(tk.Toplevel):
         self.format_bibtex()
         self.update_cm()
 
-    def format_bibtex(self):
+    def format_bibtex(self, formatter=None):
         cmd = self.bibtex_radio_options.get()
         print(cmd)
-        f = self.cm.bibtex_formatter
+        f = formatter if formatter else self.cm.bibtex_formatter
         m = getattr(f, cmd, None)
         if m:
+            self.displayed_bibtex = m()
             self.bibtex_field.delete("1.0",tk.END)
-            self.bibtex_field.insert("1.0", m())
+            self.bibtex_field.insert("1.0", self.displayed_bibtex)
         else:
             raise ValueError(f"Invalid method: {m}")
 
@@ -796,36 +831,26 @@ class HierarchyWindow(tk.Toplevel):
 
     def match_venue(self):
         """Matches journal name against venue_mapping regex and sets the venue_combo value."""
-        journal_name = self.journal_var.get()
-
-        for mapping in self.main_app.config_data.get("venue_mapping", []):  # Ensure venue_mapping exists
-            pattern = mapping.get("regex", "")
-            venue = mapping.get("venue-mapping", "")
-
-            if pattern and re.search(pattern, journal_name, re.IGNORECASE):  # Case-insensitive match
-                self.venue_combo.set(venue)
-                return  # Stop after the first match
-
-        # If no match is found, clear or set a default
-        self.venue_combo.set("")
+        # Same matching as for imported entries, see citation_manager.venue_for_journal
+        self.venue_combo.set(venue_for_journal(self.journal_var.get(), self.main_app.config_path))
 
     def validate_key(self):
         self.start_waiting_anim()
         self.update_key_validation()
 
     def start_waiting_anim(self):
+        if self.is_waiting:
+            return  # Animation is already running
         self.is_waiting = True
         self.waiting_for_response_anim()
 
     def update_bibtex_key(self):
-        bibtex = self.bibtex_field.get("1.0", tk.END)
-        bib_data = bibtexparser.loads(bibtex)
-        for entry in bib_data.entries:
-            if entry['ID']:
-                entry['ID'] = self.key_entry.get()
-
-        self.bibtex_field.delete("1.0", tk.END)
-        self.bibtex_field.insert("1.0", bibtexparser.dumps(bib_data))
+        formatter = self.cm.bibtex_formatter
+        if formatter is None or self.get_text_field(self.bibtex_field) != self.displayed_bibtex.strip():
+            # The text was not rendered from the last parse, e.g. it was loaded from Notion
+            formatter = BibtexFormatter(self.bibtex_field.get("1.0", tk.END))
+        formatter.set_key(self.key_entry.get())
+        self.format_bibtex(formatter)
 
     def how_to_copy(self, event):
         widget = event.widget
@@ -839,21 +864,27 @@ class HierarchyWindow(tk.Toplevel):
         #self.focus_set()
 
     def update_key_validation(self):
-        self.is_waiting = True
-        #self.key_validation.set("waiting for response")
-        #self.key_validation_label.config(text="Waiting for response", foreground="black")
-        #self.waiting_for_response_anim()
-        if self.check_key():
-            self.is_waiting = False
+        title = self.key_entry.get()
+        self.main_app.worker.submit(self.main_app.notion_mirror.validate_key_availability, title,
+                                    on_success=self.show_key_validation, on_error=self.show_request_error, widget=self)
+
+    def show_key_validation(self, available):
+        self.is_waiting = False
+        if available:
             self.key_validation.set("is available")
             self.key_validation_label.config(foreground="green")
             self.update_bibtex_key()
         else:
-            self.is_waiting = False
             self.key_validation.set("is NOT available!!")
             self.key_validation_label.config(foreground="red")
 
-    def waiting_for_response_anim(self): #not working
+    def show_request_error(self, error):
+        self.is_waiting = False
+        self.key_validation.set("request failed")
+        self.key_validation_label.config(foreground="red")
+        messagebox.showwarning(type(error).__name__, str(error))
+
+    def waiting_for_response_anim(self):
         """Animate the label by adding dots."""
         self.dots
         if self.is_waiting:
@@ -865,25 +896,35 @@ class HierarchyWindow(tk.Toplevel):
             # Schedule the next animation frame
             self.after(500, self.waiting_for_response_anim)
 
-    def check_key(self):
-        title = self.key_entry.get()
-        return self.main_app.notion_api.validate_key_availability(title)
-
     def load_key(self):
         title = self.key_entry.get()
-        page = self.main_app.notion_api.request_page(title)
+        self.start_waiting_anim()
+        self.main_app.worker.submit(self.main_app.notion_mirror.request_page, title,
+                                    on_success=lambda page: self.show_loaded_page(page, title),
+                                    on_error=self.show_request_error, widget=self)
+
+    def show_loaded_page(self, page, title):
+        self.is_waiting = False
+        if page is None or not page.notion_page_id:
+            self.key_validation.set("not found")
+            self.key_validation_label.config(foreground="red")
+            return
+        self.key_validation.set("loaded")
+        self.key_validation_label.config(foreground="green")
         pprint.pprint(page)
         self.clear_projects()
         for project in page.project:
             self.add_or_remove_project(project)
         self.notion_page_id = page.notion_page_id
+        self.notion_page = page
         self.bibtex_field.insert("1.0", page.bibtex_safe())
         self.title_var.set(page.title_safe())
         self.authors = page.authors.get_string(", ")
         self.authors_var.set(self.authors)
         self.abstract_field.insert("1.0", page.abstract_safe())
         self.journal_var.set(page.journal_safe())
-        self.venue_combo.set(page.venue_safe())
+        venues = page.venue_safe()  # multi_select in Notion, the form shows the first venue
+        self.venue_combo.set(venues[0] if venues else "")
         self.year_var.set(page.year_safe())
         self.count_var.set(page.count_safe())
         self.pdf_var.set(self.pdf_handler.find_paper_path(title))
@@ -920,20 +961,55 @@ class HierarchyWindow(tk.Toplevel):
             return
         try:
             data = self.prepare_data_for_notion()
-            self.main_app.notion_api.create_page(data)
-            self.sent_to_notion = True
         except ValueError as e:
             messagebox.showwarning("ValueError", str(e))
+            return
+        self.sent_to_notion = True  # Blocks a second send while the request is in flight
+        self.main_app.worker.submit(self._write_to_notion, self.main_app.notion_api.create_page, data,
+                                    on_success=self.on_notion_written, on_error=self.on_create_failed, widget=self)
 
     def update_notion_entry(self):
-        if not (self.sent_to_notion or self.loaded_from_notion):
+        if not (self.sent_to_notion or self.loaded_from_notion) or not self.notion_page_id:
             messagebox.showerror("Error", "This is probably not gonna work")
+            return
+        if self.notion_page is None:
+            # Nothing to compare with, so every field counts as changed
+            self.notion_page = NotionPage({"id": self.notion_page_id, "properties": {}})
         try:
             data = self.prepare_data_for_notion()
-            data["notion_page_id"] = self.notion_page_id
-            self.main_app.notion_api.update_page(data)
+            # Only the fields that differ from the page are sent; rapid updates are merged into one request
+            self.notion_page.update(data)  # Raises ValueError for text beyond Notion's limits
         except ValueError as e:
             messagebox.showwarning("ValueError", str(e))
+            return
+        changes = self.notion_page.changes()
+        if not changes:
+            return
+        self.notion_page.mark_clean()
+        self.main_app.notion_updates.enqueue(self.notion_page_id, changes,
+                                             on_error=lambda error: self.on_update_failed(changes, error), widget=self)
+
+    def _write_to_notion(self, method, data):
+        """Runs on the worker thread: send the page and keep the local mirror in sync."""
+        page_json = method(data).json()
+        self.main_app.notion_mirror.upsert(page_json)
+        return page_json
+
+    def on_notion_written(self, page_json):
+        self.notion_page_id = page_json.get("id")
+        self.notion_page = NotionPage(page_json)
+
+    def on_update_failed(self, changes, error):
+        if self.notion_page is not None:
+            self.notion_page.mark_dirty(changes)  # Sent again with the next update
+        self.on_notion_write_failed(error)
+
+    def on_create_failed(self, error):
+        self.sent_to_notion = False
+        self.on_notion_write_failed(error)
+
+    def on_notion_write_failed(self, error):
+        messagebox.showwarning(type(error).__name__, str(error))
 
     def get_bibtex_field(self):
         return self.bibtex_field.get("1.0", tk.END).strip()
@@ -982,7 +1058,6 @@ class HierarchyWindow(tk.Toplevel):
         cm.link_doi = self.link_doi_entry.get().strip()
         cm.journal = self.journal_var.get()
         cm.venue = self.venue_combo.get() if self.venue_combo.get() else cm.venue
-        cm.authors =
         self.cm = cm
         pprint.pprint(self.cm)
 
@@ -1019,6 +1094,7 @@ class HierarchyWindow(tk.Toplevel):
     def clear_fields(self):
         self.sent_to_notion = False
         self.loaded_from_notion = False
+        self.notion_page = None
 
         self.key_entry.delete(0, tk.END)
         self.title_var.set("")
@@ -1087,6 +1163,7 @@ class HierarchyWindow(tk.Toplevel):
             self.main_app.remove_from_tree(child)
 
     def close_window(self):
+        self.main_app.notion_updates.flush()  # Do not hold back edits of the closed window
         # Remove this window and its children from the tree
         self.remove_children(self.name)
         self.main_app.remove_from_tree(self.name)
@@ -1097,6 +1174,10 @@ class HierarchyWindow(tk.Toplevel):
     #     print(f"Window {self.name} destroyed")
 
 if __name__ == "__main__":
+    # Debug output of the citation pipeline is off by default, enable it with e.g. NORMAN_LOG_LEVEL=DEBUG
+    logging.basicConfig(level=os.environ.get("NORMAN_LOG_LEVEL", "WARNING").upper(),
+                        format="%(levelname)s %(name)s: %(message)s")
+
     # Create and run the main application
     app = MainApp()
     app.mainloop()
@@ -1,35 +1,220 @@
+import asyncio
+import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 import json
 import pprint
+import time
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
 from authors import *
+from notion_schema import NotionSchema, DECODERS
+from rate_limiter import TokenBucket
+
+__all__ = ["NotionPage", "NotionPageCollection", "NotionAPI", "AsyncNotionAPI", "SyncStats"]
+
+logger = logging.getLogger(__name__)
+
+
+class SyncStats:
+    """Throughput counters for a paginated database query."""
+
+    def __init__(self):
+        self.requests = 0
+        self.pages = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def add(self, pages, nbytes):
+        self.requests += 1
+        self.pages += pages
+        self.bytes += nbytes
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+    @property
+    def pages_per_sec(self):
+        return self.pages / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def bytes_per_sec(self):
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (f"SyncStats(pages={self.pages}, requests={self.requests}, bytes={self.bytes}, "
+                f"elapsed={self.elapsed:.2f}s, pages_per_sec={self.pages_per_sec:.1f}, "
+                f"bytes_per_sec={self.bytes_per_sec:.0f})")
 
-__all__ = ["NotionPage", "NotionAPI"]
 
 class NotionAPI:
-    def __init__(self, config_path='configs/notion_config.json'):
+    QUERY_PAGE_SIZE = 100  # Maximum page_size accepted by Notion's query endpoint
+    FILTER_CHUNK_SIZE = 100  # Maximum number of conditions in one compound filter
+    POOL_SIZE = 10
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+    MAX_BACKOFF = 60
+
+    def __init__(self, config_path='configs/notion_config.json', rate_limiter=None):
+        """
+        :param config_path: Notion config with NOTION_TOKEN and DATABASE_ID. Optional keys
+            RATE_LIMIT (requests/s), MAX_RETRIES, BACKOFF_FACTOR and TIMEOUT (seconds per
+            request) tune the transport.
+        :param rate_limiter: TokenBucket to share with other clients; one is created if omitted.
+        """
         self._load_config(config_path)
         self.headers = {
             "Authorization": f"Bearer {self.NOTION_TOKEN}",
             "Content-Type": "application/json",
             "Notion-Version": "2022-06-28",
         }
+        # One pooled keep-alive session for all calls instead of a new TLS connection per request
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.POOL_SIZE))
+        self.rate_limiter = rate_limiter if rate_limiter else TokenBucket(self.rate_limit)
 
     def _load_config(self, config_path):
         with open(config_path, 'r') as file:
             notion_config = json.load(file)
         self.NOTION_TOKEN = notion_config["NOTION_TOKEN"]
         self.DATABASE_ID = notion_config["DATABASE_ID"]
+        self.rate_limit = notion_config.get("RATE_LIMIT", 3)  # Notion allows an average of 3 requests/s
+        self.max_retries = notion_config.get("MAX_RETRIES", 5)
+        self.backoff_factor = notion_config.get("BACKOFF_FACTOR", 0.5)
+        self.timeout = notion_config.get("TIMEOUT", 30)
 
-    def request_pages(self, page_size=5):
-        url = f"https://api.notion.com/v1/databases/{self.DATABASE_ID}/query"
-        payload = {"page_size": page_size}
-        response = requests.post(url, json=payload, headers=self.headers)
-        data = response.json()
+    def _request(self, method, url, idempotent=True, **kwargs):
+        """
+        Send a request through the pooled session. Every attempt waits for the rate
+        limiter; 429 and 5xx responses as well as dropped connections and timeouts are
+        retried with exponential back-off, honouring Retry-After when Notion sends it.
+        Raises ValueError with Notion's error message if the final response is not 200.
+        :param idempotent: False for requests that must not run twice (creating a page):
+            a 5xx or a dropped connection may come after Notion already executed them,
+            so they are only retried on 429 and on failures to connect.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        retry_status = self.RETRY_STATUS if idempotent else {429}
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                res = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries or not (idempotent or self._not_sent(e)):
+                    raise
+                delay = self._backoff(attempt)
+                logger.info("Connection error (%s), retrying in %.1fs", e, delay)
+                time.sleep(delay)
+                continue
+
+            if res.status_code not in retry_status or attempt == self.max_retries:
+                break
+            delay = self._retry_after(res) or self._backoff(attempt)
+            logger.info("Notion returned %s, retrying in %.1fs", res.status_code, delay)
+            if res.status_code == 429:
+                self.rate_limiter.pause(delay)  # Hold back all callers sharing the limiter
+            else:
+                time.sleep(delay)
+
+        self._check_response(res)
+        return res
+
+    @staticmethod
+    def _not_sent(error):
+        """True if the request failed while connecting, so it never reached Notion."""
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+
+    def _backoff(self, attempt):
+        return min(self.MAX_BACKOFF, self.backoff_factor * (2 ** attempt))
+
+    def _retry_after(self, res):
+        """Parse a Retry-After header given in seconds or as HTTP date; None if absent."""
+        value = res.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return min(self.MAX_BACKOFF, max(0.0, float(value)))
+        except ValueError:
+            pass
+        try:
+            return min(self.MAX_BACKOFF, max(0.0, parsedate_to_datetime(value).timestamp() - time.time()))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _check_response(res):
+        if res.status_code != 200:
+            j = res.json()
+            pprint.pprint(j)
+            raise ValueError(f"{j['code']} ({j['status']})\n{j['message']}")
+
+    def request_pages(self, page_size=QUERY_PAGE_SIZE):
+        results = self.query_pages(page_size=page_size).results
 
         with open('db.json', 'w', encoding='utf8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+            json.dump(results, f, ensure_ascii=False, indent=4)
 
-        return data.get("results", [])
+        return results
+
+    def query_database(self, payload):
+        """
+        Run a single database query and return the decoded response together with
+        the size of the response body in bytes.
+        """
+        url = f"https://api.notion.com/v1/databases/{self.DATABASE_ID}/query"
+        res = self._request("POST", url, json=payload)
+        return res.json(), len(res.content)
+
+    def iter_pages(self, filter=None, sorts=None, page_size=QUERY_PAGE_SIZE, stats=None):
+        """
+        Stream every page of the database as NotionPage objects, following
+        next_cursor until has_more is false. The next cursor page is requested in a
+        background thread while the current one is being consumed, so a full pull
+        costs roughly one round trip per page instead of round trip plus processing.
+        :param filter: Optional Notion filter object.
+        :param sorts: Optional list of Notion sort objects.
+        :param stats: Optional SyncStats instance that receives throughput counters.
+        """
+        payload = {"page_size": min(page_size, self.QUERY_PAGE_SIZE)}
+        if filter:
+            payload["filter"] = filter
+        if sorts:
+            payload["sorts"] = sorts
+        stats = stats if stats is not None else SyncStats()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(self.query_database, payload)
+            while pending is not None:
+                data, nbytes = pending.result()
+                results = data.get("results", [])
+                stats.add(len(results), nbytes)
+
+                pending = None
+                if data.get("has_more") and data.get("next_cursor"):
+                    pending = executor.submit(self.query_database, {**payload, "start_cursor": data["next_cursor"]})
+
+                for result in results:
+                    yield NotionPage(result)
+
+        stats.finish()
+        logger.debug("Synced %s", stats)
+
+    def query_pages(self, filter=None, sorts=None, page_size=QUERY_PAGE_SIZE, stats=None):
+        """
+        Run a complete paginated query (see iter_pages) and return all of its pages as
+        a NotionPageCollection, for lookups by key or page id and filtering in memory.
+        """
+        return NotionPageCollection(self.iter_pages(filter=filter, sorts=sorts, page_size=page_size, stats=stats))
 
     def request_page(self, title):
         url = f"https://api.notion.com/v1/databases/{self.DATABASE_ID}/query"
@@ -39,11 +224,31 @@ class NotionAPI:
                 "title": {"equals": title}
             }
         }
-        # TODO: Make this call async
-        response = requests.post(url, json=payload, headers=self.headers)
+        response = self._request("POST", url, json=payload)
         page = NotionPage(response.json())
         return page
 
+    def find_pages_by_keys(self, keys, prefix=False):
+        """
+        Look up many keys with as few queries as possible: one compound 'or' filter per
+        FILTER_CHUNK_SIZE keys. Returns {key: page id} of the pages found.
+        :param prefix: Match keys starting with the given keys (e.g. to find Heer2024a
+            for Heer2024) instead of exact keys.
+        """
+        wanted = sorted(set(key for key in keys if key))
+        condition = "starts_with" if prefix else "equals"
+        found = {}
+        for i in range(0, len(wanted), self.FILTER_CHUNK_SIZE):
+            chunk = wanted[i:i + self.FILTER_CHUNK_SIZE]
+            page_filter = {"or": [{"property": "Key", "title": {condition: key}} for key in chunk]}
+            pages = self.query_pages(filter=page_filter)
+            found.update((key, page_id) for key, page_id in pages.key_map().items() if prefix or key in chunk)
+        return found
+
+    def find_taken_keys(self, keys):
+        """Return the subset of keys that already exist in the database (batched, see find_pages_by_keys)."""
+        return set(self.find_pages_by_keys(keys))
+
     def validate_key_availability(self, title):
         page = self.request_page(title)
         if page.json_data.get("results"):
@@ -57,65 +262,27 @@ class NotionAPI:
         #pprint.pprint(prepped_data)
         url = "https://api.notion.com/v1/pages"
         payload = {"parent": {"database_id": self.DATABASE_ID}, "properties": prepped_data}
-        # TODO: make this call asynchronous
-        res = requests.post(url, headers=self.headers, json=payload)
+        res = self._request("POST", url, json=payload, idempotent=False)  # A retry could create the page twice
         print(res.status_code)
-        if res.status_code != 200:
-            j = res.json()
-            pprint.pprint(j)
-            raise ValueError(f"{j["code"]} ({j["status"]})\n{j["message"]}")
         return res
 
+    def update_page_fields(self, page_id, fields):
+        """PATCH only the given fields of a page ({field: value}); empty values clear the property."""
+        url = f"https://api.notion.com/v1/pages/{page_id}"
+        payload = {"properties": NotionSchema.load().encode_fields(fields)}
+        return self._request("PATCH", url, json=payload)
+
     def update_page(self, data):
         prepped_data = self.prep_data(data)
         url = f"https://api.notion.com/v1/pages/{data["notion_page_id"]}"
         payload = {"properties": prepped_data}
-        res = requests.patch(url, headers=self.headers, json=payload)
+        res = self._request("PATCH", url, json=payload)
         print(res.status_code)
-        if res.status_code != 200:
-            j = res.json()
-            pprint.pprint(j)
-            raise ValueError(f"{j["code"]} ({j["status"]})\n{j["message"]}")
         return res
 
-# TODO: Move these mappings into config
     def prep_data(self, data):
-        retdata = {}
-        mappings = {
-            "key": ("Key", "title"),
-            "papertrail": ("Papertrail", "rich_text"),
-            "bibtex": ("Bibtex", "rich_text"),
-            "year": ("Year", "number"),
-            "title": ("Title", "rich_text"),
-            "project": ("Project_tag", "multi_select"),
-            "abstract": ("Abstract", "rich_text"),
-            "count": ("Citation count", "number"),
-            "type": ("Type", "select"),
-            "notes": ("Notes", "rich_text"),
-            "link_doi": ("Link/DOI", "url"),
-            "journal": ("Journal", "rich_text"),
-            "venue": ("Venue", "multi_select"),
-            "authors": ("Authors", "multi_select"),
-            "short_title": ("Short_title", "rich_text"),
-            "short_title_manual": ("Short_title_manual", "checkbox")
-        }
-
-        for key, (notion_key, notion_type) in mappings.items():
-            if key in data and data[key]:  # Ensure data[key] exists and is not empty
-                if notion_type in ["title", "rich_text"]:
-                    retdata[notion_key] = {notion_type: [{"text": {"content": data[key]}}]}
-                elif notion_type == "number":
-                    retdata[notion_key] = {notion_type: self.safe_int(data[key])}  # Default to 0 if invalid
-                elif notion_type == "multi_select":
-                    if isinstance(data[key], str):
-                        retdata[notion_key] = {notion_type: [{"name": data[key]}]}  # Single string
-                    elif isinstance(data[key], list):
-                        retdata[notion_key] = {notion_type: [{"name": item} for item in data[key]]}  # List of names
-                elif notion_type == "select":
-                    retdata[notion_key] = {notion_type: {"name": data[key]}}
-                elif notion_type in ["url","checkbox"]:
-                    retdata[notion_key] = {notion_type: data[key]}
-        return retdata
+        """Notion properties payload for the non-empty fields of data, see NotionSchema."""
+        return NotionSchema.load().encode(data)
 
     def safe_int(self, value, default=""):
         """Convert a value to an integer safely, returning a default if conversion fails."""
@@ -125,131 +292,232 @@ class NotionAPI:
             return default  # Return default value if conversion fails
 
 
+class AsyncNotionAPI:
+    """
+    Asyncio client exposing the NotionAPI calls as coroutines. Requests run on a
+    bounded thread pool over the wrapped NotionAPI, so they share its pooled session,
+    retries and rate limiter: many calls overlap their round trips while the sustained
+    rate still stays within Notion's limit.
+
+        async with AsyncNotionAPI(max_concurrency=8) as api:
+            results = await asyncio.gather(*(api.create_page(d) for d in entries))
+    """
+
+    def __init__(self, api=None, max_concurrency=8, config_path='configs/notion_config.json'):
+        """
+        :param api: NotionAPI to wrap; a new one is created from config_path if omitted.
+        :param max_concurrency: Maximum number of requests in flight at once.
+        """
+        self.api = api if api else NotionAPI(config_path)
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        if max_concurrency > self.api.POOL_SIZE:
+            self.api.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency))
+
+    async def _call(self, func, *args):
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+
+    async def request_page(self, title):
+        return await self._call(self.api.request_page, title)
+
+    async def validate_key_availability(self, title):
+        return await self._call(self.api.validate_key_availability, title)
+
+    async def query_pages(self, filter=None, sorts=None):
+        return await self._call(self.api.query_pages, filter, sorts)
+
+    async def find_taken_keys(self, keys):
+        return await self._call(self.api.find_taken_keys, keys)
+
+    async def create_page(self, data):
+        return await self._call(self.api.create_page, data)
+
+    async def update_page(self, data):
+        return await self._call(self.api.update_page, data)
+
+    async def update_page_fields(self, page_id, fields):
+        return await self._call(self.api.update_page_fields, page_id, fields)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _Field:
+    """
+    Class-level accessor for one schema field of NotionPage. The value is decoded
+    from the page JSON on first access and cached in the instance, where it shadows
+    this descriptor for all later lookups (and for set_value).
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    def __get__(self, page, owner=None):
+        if page is None:
+            return self
+        value = page.decode_field(self.field)
+        page.__dict__[self.field] = value
+        return value
+
+
+class _SafeAccessor:
+    """Class-level <field>_safe() accessor: the field value, or an empty string if it is empty."""
+
+    def __init__(self, field):
+        self.field = field
+
+    def __get__(self, page, owner=None):
+        if page is None:
+            return self
+        field = self.field
+
+        def safe_method():
+            value = getattr(page, field, None)
+            return value if value else ""
+        return safe_method
+
+
 class NotionPage:
+    _fields_schema = None  # Schema whose fields are installed as descriptors on the class
+
     def __init__(self, json_data=None):
         """
-        Initialize a NotionPage instance with JSON input.
+        Initialize a NotionPage instance with JSON input. Field values are decoded
+        lazily, on first access.
         :param json_data: Dictionary containing Notion API structured data.
         """
         self.json_data = json_data if json_data else {}
-        if self.json_data and self.json_data["object"] == "list":
-            if len(self.json_data["results"]):
-                self.notion_page_id = self.json_data["results"][0].get("id", {})
-            else:
-                self.json_data.get("id", {})
+        self.notion_page_id = None
+        if self.json_data.get("object") == "list":
+            if self.json_data.get("results"):
+                self.notion_page_id = self.json_data["results"][0].get("id")
+        elif self.json_data:
+            self.notion_page_id = self.json_data.get("id")
         #self.notion_page_id = self.json_data["results"][0].get("id", {}) if self.json_data["object"] == "list" else self.json_data.get("id", {})
         #print(f"Notion Page ID: {self.notion_page_id}")
-# NOTE: Yepp, I really gotta move this code-duplication into config!!
-        self.mappings = {
-            "key": ("Key", "title"),
-            "papertrail": ("Papertrail", "rich_text"),
-            "bibtex": ("Bibtex", "rich_text"),
-            "year": ("Year", "number"),
-            "title": ("Title", "rich_text"),
-            "project": ("Project_tag", "multi_select"),
-            "abstract": ("Abstract", "rich_text"),
-            "count": ("Citation count", "number"),
-            "type": ("Type", "select"),
-            "notes": ("Notes", "rich_text"),
-            "link_doi": ("Link/DOI", "url"),
-            "journal": ("Journal", "rich_text"),
-            "venue": ("Venue", "select"),
-            "authors": ("Authors", "multi_select"),
-            "short_title": ("Short_title", "rich_text"),
-            "short_title_manual": ("Short_title_manual", "checkbox")
-        }
-
-        # Initialize attributes based on mappings
-        for key, (notion_key, notion_type) in self.mappings.items():
-            if key == "authors":
-                # Apply AuthorList.from_array() for authors
-                raw_authors = self.extract_value(notion_key, notion_type)
-                setattr(self, key, AuthorList.from_array(raw_authors) if raw_authors else None)
-            else:
-                setattr(self, key, self.extract_value(notion_key, notion_type) if self.json_data else None)
-
-            # Dynamically create the _safe method for each key
-            setattr(self, f"{key}_safe", self.make_safe_method(key))
-
+        self.schema = NotionSchema.load()
+        self._changes = {}  # Fields set since the last mark_clean, see changes()
+        if self.schema is not NotionPage._fields_schema:
+            NotionPage._install_fields(self.schema)
+
+    @classmethod
+    def _install_fields(cls, schema):
+        """Add the field and <field>_safe descriptors for every property of the schema."""
+        for prop in schema:
+            if not isinstance(cls.__dict__.get(prop.field), _Field):
+                setattr(cls, prop.field, _Field(prop.field))
+                setattr(cls, f"{prop.field}_safe", _SafeAccessor(prop.field))
+        cls._fields_schema = schema
+
+    def properties(self):
+        """
+        Return the properties of the wrapped page. Accepts both a query response
+        (first result is used) and a single page object, as yielded by iter_pages.
+        """
+        if self.json_data.get("object") == "list":
+            if not self.json_data.get("results"):
+                return None
+            return self.json_data["results"][0].get("properties", {})
+        return self.json_data.get("properties", {})
 
     def extract_value(self, notion_key, notion_type):
         """
         Extract a value from the JSON data based on its type.
         """
-        if "results" not in self.json_data or not self.json_data["results"]:
+        properties = self.properties()
+        if properties is None:
             print("Error: 'results' key missing or empty in self.json_data")
             return None
 
-        properties = self.json_data["results"][0].get("properties", {}) if self.json_data["object"] == "list" else self.json_data.get("properties", {})
-
         if notion_key not in properties:
             print(f"Error: notion_key '{notion_key}' not found in properties")
             return None
 
-        notion_value = properties[notion_key]
-        #print(f"Extracting {notion_type} from '{notion_key}'...")
-
-        # Handling different notion types
-        if notion_type in ["title", "rich_text"]:
-            rich_text_data = notion_value.get(notion_type, [])
-            if rich_text_data and isinstance(rich_text_data, list) and "text" in rich_text_data[0]:
-                return rich_text_data[0]["text"].get("content", "")
-            return ""
-
-        elif notion_type == "number":
-            return notion_value.get(notion_type, 0)  # Default to 0 if missing
-
-        elif notion_type == "multi_select":
-            return [item.get("name", "") for item in notion_value.get(notion_type, [])]
-
-        elif notion_type == "select":
-            select_data = notion_value.get(notion_type)
-            return select_data["name"] if isinstance(select_data, dict) and "name" in select_data else ""
-
-        elif notion_type == "url":
-            return notion_value.get(notion_type, "")
-
-        elif notion_type == "checkbox":
-            return notion_value.get(notion_type, False)
-
-        print(f"Warning: Unsupported notion_type '{notion_type}'")
-        return None
+        decode = DECODERS.get(notion_type)
+        if decode is None:
+            print(f"Warning: Unsupported notion_type '{notion_type}'")
+            return None
+        return decode(properties[notion_key])
 
-    def make_safe_method(self, key):
-        """Returns a method that safely retrieves the attribute or an empty string."""
-        def safe_method():
-            value = getattr(self, key, None)  # Get the original value
-            return value if value else ""  # Return empty string if None or empty
-        return safe_method  # Return the function itself
+    def decode_field(self, field):
+        """Decode the value of a schema field from the page JSON; None if the page lacks it."""
+        properties = self.properties() if self.json_data else None
+        if properties is None:
+            return None
+        prop = self.schema[field]
+        notion_value = properties.get(prop.name)
+        value = prop.decode(notion_value) if notion_value is not None else None
+        if field == "authors":
+            # Apply AuthorList.from_array() for authors
+            value = AuthorList.from_array(value) if value else None
+        return value
 
     def get_value(self, key):
         """
         Get the value of a specific field.
         """
-        if key in self.mappings:
+        if key in self.schema:
             return getattr(self, key, None)
         raise KeyError(f"Key '{key}' not found in Notion mappings.")
 
     def set_value(self, key, value):
         """
-        Set a new value for a specific field and update JSON data.
-        """
-        if key in self.mappings:
-            notion_key, notion_type = self.mappings[key]
-            if notion_type in ["title", "rich_text"]:
-                self.json_data[notion_key] = {notion_type: [{"text": {"content": value}}]}
-            elif notion_type == "number":
-                self.json_data[notion_key] = {notion_type: int(value)}
-            elif notion_type == "multi_select":
-                self.json_data[notion_key] = {notion_type: [{"name": v} for v in value]}
-            elif notion_type == "select":
-                self.json_data[notion_key] = {notion_type: {"name": value}}
-            elif notion_type in ["url","checkbox"]:
-                self.json_data[notion_key] = {notion_type: value}
+        Set a new value for a specific field and update JSON data. The field is
+        marked as changed until mark_clean is called.
+        """
+        if key in self.schema:
+            prop = self.schema[key]
+            properties = self.properties()
+            if properties is not None:
+                properties[prop.name] = {prop.type: prop.encode_value(value)}
             setattr(self, key, value)
+            self._changes[key] = value
         else:
             raise KeyError(f"Key '{key}' not found in Notion mappings.")
 
+    def update(self, data):
+        """
+        Set the fields of data (e.g. prepare_data_for_notion) whose value differs from
+        the page. Values are compared after a round trip through the schema, so "12"
+        equals 12 for a number and "VIS" equals ["VIS"] for a multi_select.
+        Returns the names of the changed fields.
+        """
+        changed = []
+        for key, value in data.items():
+            if key in self.schema and self._differs(key, value):
+                self.set_value(key, value)
+                changed.append(key)
+        return changed
+
+    def changes(self):
+        """{field: value} of the fields changed since the last mark_clean."""
+        return dict(self._changes)
+
+    def mark_clean(self):
+        self._changes.clear()
+
+    def mark_dirty(self, changes):
+        """Mark fields as changed again, e.g. after their update failed; newer changes are kept."""
+        for key, value in changes.items():
+            self._changes.setdefault(key, value)
+
+    def _differs(self, key, value):
+        prop = self.schema[key]
+        properties = self.properties() if self.json_data else None
+        current = properties.get(prop.name) if properties is not None else None
+        current = prop.decode(current) if current is not None else None
+        new = prop.decode({prop.type: prop.encode_value(value)})
+        return (new or None) != (current or None)  # All empty values are equal
+
     def get_json(self):
         """
         Get the modified Notion JSON data.
@@ -257,7 +525,8 @@ class NotionPage:
         return self.json_data
 
     def get_bibtex(self):
-        return self.json_data["results"][0]["properties"]["Bibtex"]["rich_text"][0]["text"]["content"]
+        prop = self.schema["bibtex"]
+        return prop.decode(self.properties()[prop.name])
 
     def safe_call(self, attribute):
         attr = getattr(self, attribute, None)
@@ -267,7 +536,108 @@ class NotionPage:
         return f"NotionPage({vars(self)})"
         """
         Returns a string representation of the object, listing all attributes
-        defined in mappings without calling json_data.
+        defined in the schema without calling json_data.
         """
         # attr_values = {key: getattr(self, key, None) for key in self.mappings.keys()}
         # return f"NotionPage({attr_values})"
+
+
+class NotionPageCollection:
+    """
+    All pages of a query: a list response ({"object": "list", "results": [...]}), a
+    list of page objects, or any iterable of page objects or NotionPages such as
+    NotionAPI.iter_pages. NotionPages are created on first access and the key and
+    page id indexes on first lookup, so holding a whole database costs little more
+    than its JSON.
+    """
+
+    def __init__(self, json_data=None):
+        """
+        :param json_data: Query response, page object, or iterable of page objects/NotionPages.
+        """
+        self.has_more = False
+        self.next_cursor = None
+        if isinstance(json_data, dict):
+            if json_data.get("object") == "list":
+                self.has_more = json_data.get("has_more", False)
+                self.next_cursor = json_data.get("next_cursor")
+                items = json_data.get("results", [])
+            else:
+                items = [json_data]
+        else:
+            items = json_data if json_data is not None else []
+        self.results = []  # Page objects
+        self._pages = []  # NotionPage per result, None until first accessed
+        self._by_key = None
+        self._by_id = None
+        self.extend(items)
+
+    def extend(self, items):
+        """Add page objects or NotionPages, e.g. the results of a further query."""
+        for item in items:
+            if isinstance(item, NotionPage):
+                self.results.append(item.json_data)
+                self._pages.append(item)
+            else:
+                self.results.append(item)
+                self._pages.append(None)
+        self._by_key = self._by_id = None
+
+    def __len__(self):
+        return len(self.results)
+
+    def __getitem__(self, index):
+        page = self._pages[index]
+        if page is None:
+            page = self._pages[index] = NotionPage(self.results[index])
+        return page
+
+    def __iter__(self):
+        for index in range(len(self.results)):
+            yield self[index]
+
+    def __contains__(self, key):
+        return key in self._key_index()
+
+    def get(self, key, default=None):
+        """Return the page with the given citation key (the first one, if stored twice)."""
+        index = self._key_index().get(key)
+        return self[index] if index is not None else default
+
+    def by_id(self, page_id, default=None):
+        """Return the page with the given Notion page id."""
+        if self._by_id is None:
+            self._by_id = {result.get("id"): index for index, result in enumerate(self.results)}
+        index = self._by_id.get(page_id)
+        return self[index] if index is not None else default
+
+    def keys(self):
+        return list(self._key_index())
+
+    def key_map(self):
+        """Return {citation key: page id} of the pages that have a key."""
+        return {key: self.results[index].get("id") for key, index in self._key_index().items()}
+
+    def filter(self, predicate=None, **fields):
+        """
+        Return a new collection of the pages for which predicate(page) is true and
+        every given field equals its value, e.g. filter(type="Paper", year=2024).
+        """
+        matches = []
+        for page in self:
+            if predicate is not None and not predicate(page):
+                continue
+            if all(getattr(page, field) == value for field, value in fields.items()):
+                matches.append(page)
+        return NotionPageCollection(matches)
+
+    def _key_index(self):
+        if self._by_key is None:
+            self._by_key = {}
+            for index, page in enumerate(self):
+                if page.key:
+                    self._by_key.setdefault(page.key, index)
+        return self._by_key
+
+    def __repr__(self):
+        return f"NotionPageCollection({len(self)} pages)"
@@ -0,0 +1,185 @@
+import json
+import os
+import sqlite3
+import threading
+from citation_keys import CitationKeyIndex
+from config_handler import ConfigHandler
+from notion import NotionPage, SyncStats
+
+__all__ = ["NotionMirror"]
+
+class NotionMirror:
+    """
+    Local SQLite copy of the Notion reference database, keyed by citation key and
+    Notion page id. Populated by a full sync and refreshed with delta syncs that only
+    fetch pages edited since the last sync, so key lookups and availability checks
+    never leave the machine.
+
+    NOTE: Notion's query endpoint does not return archived pages, so pages deleted
+    in Notion only disappear from the mirror on the next full sync.
+    """
+
+    DEFAULT_PATH = os.path.join(ConfigHandler.CONFIG_DIR, "notion_mirror.sqlite")
+    EPOCH = "1970-01-01T00:00:00.000Z"  # Sync marker for an empty database
+
+    def __init__(self, api=None, path=DEFAULT_PATH):
+        """
+        :param api: NotionAPI used for syncing and as fallback while the mirror is empty.
+        :param path: Location of the SQLite file.
+        """
+        self.api = api
+        self.path = path
+        self._lock = threading.Lock()
+        self._key_index = None
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " page_id TEXT PRIMARY KEY,"
+                " key TEXT,"
+                " last_edited_time TEXT,"
+                " data TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS pages_key ON pages(key)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS sync_state (name TEXT PRIMARY KEY, value TEXT)")
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    # Sync
+
+    def is_synced(self):
+        """True once at least one full sync has completed."""
+        return self._get_state("last_edited_time") is not None
+
+    def full_sync(self, stats=None):
+        """Replace the mirror with the complete contents of the Notion database."""
+        stats = stats if stats is not None else SyncStats()
+        rows = [self._row(page.json_data) for page in self.api.iter_pages(stats=stats)]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", rows)
+            self._set_state("last_edited_time", self._max_edited_time(rows, self.EPOCH))
+        if self._key_index is not None:
+            # Rebuilt in place: CitationManagers hold on to the index returned by key_index()
+            self._key_index.clear()
+            self._key_index.update(row[1] for row in rows)
+        return stats
+
+    def delta_sync(self, stats=None):
+        """
+        Fetch only the pages edited since the last sync. Falls back to a full sync
+        if the mirror has never been populated.
+        """
+        since = self._get_state("last_edited_time")
+        if since is None:
+            return self.full_sync(stats)
+
+        stats = stats if stats is not None else SyncStats()
+        # Notion rounds last_edited_time to the minute, so on_or_after re-fetches the
+        # last minute of edits - harmless, as rows are upserted.
+        page_filter = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": since}}
+        rows = [self._row(page.json_data) for page in self.api.iter_pages(filter=page_filter, stats=stats)]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", rows)
+            self._set_state("last_edited_time", self._max_edited_time(rows, since))
+        if self._key_index is not None:
+            self._key_index.update(row[1] for row in rows)
+        return stats
+
+    def upsert(self, page_json):
+        """Store a single page object, e.g. the response of create_page/update_page."""
+        if page_json.get("archived") or page_json.get("in_trash"):
+            with self._lock, self._conn:
+                row = self._conn.execute("SELECT key FROM pages WHERE page_id = ?", (page_json.get("id"),)).fetchone()
+                self._conn.execute("DELETE FROM pages WHERE page_id = ?", (page_json.get("id"),))
+            if row and row[0] and self._key_index is not None:
+                self._key_index.discard(row[0])
+            return
+        row = self._row(page_json)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", row)
+        if self._key_index is not None:
+            self._key_index.add(row[1])
+
+    # Lookups
+
+    def get(self, key):
+        """Return the NotionPage stored under a citation key, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM pages WHERE key = ? LIMIT 1", (key,)).fetchone()
+        return NotionPage(json.loads(row[0])) if row else None
+
+    def get_by_id(self, page_id):
+        """Return the NotionPage with the given Notion page id, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM pages WHERE page_id = ?", (page_id,)).fetchone()
+        return NotionPage(json.loads(row[0])) if row else None
+
+    def is_key_available(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM pages WHERE key = ? LIMIT 1", (key,)).fetchone()
+        return row is None
+
+    def key_map(self):
+        """Return {citation key: page id} for every stored page."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT key, page_id FROM pages WHERE key IS NOT NULL"))
+
+    def key_index(self):
+        """
+        CitationKeyIndex over the stored keys, built on first use and kept up to date by
+        syncs and upserts. Keys renamed in Notion stay in the index until the next full
+        sync, so they are at worst reported as taken.
+        """
+        if self._key_index is None:
+            self._key_index = CitationKeyIndex.from_mirror(self)
+        return self._key_index
+
+    def request_page(self, title):
+        """
+        Drop-in for NotionAPI.request_page. Answers from the mirror and only asks
+        Notion when the key is not stored locally.
+        """
+        page = self.get(title)
+        if page is not None or self.api is None:
+            return page
+        page = self.api.request_page(title)
+        if page.notion_page_id:
+            self.upsert(page.json_data["results"][0])
+        return page
+
+    def validate_key_availability(self, title):
+        """Drop-in for NotionAPI.validate_key_availability, answered locally once synced."""
+        if not self.is_synced() and self.api is not None:
+            return self.api.validate_key_availability(title)
+        return self.is_key_available(title)
+
+    # Internals
+
+    def _row(self, page_json):
+        return (
+            page_json.get("id"),
+            NotionPage(page_json).key,
+            page_json.get("last_edited_time"),
+            json.dumps(page_json, ensure_ascii=False),
+        )
+
+    @staticmethod
+    def _max_edited_time(rows, default=None):
+        times = [row[2] for row in rows if row[2]]
+        # ISO 8601 timestamps in UTC compare correctly as strings
+        return max(times + ([default] if default else []), default=default)
+
+    def _get_state(self, name):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, name, value):
+        if value is not None:
+            self._conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (name, value))
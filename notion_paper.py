@@ -3,6 +3,7 @@ import re
 from datetime import datetime, timezone
 import pprint
 import json
+from notion_schema import NotionSchema
 
 with open('configs/notion_config.json', 'r') as file:
     notion_config = json.load(file)
@@ -88,34 +89,8 @@ def prep_data(data: dict):
     #     #"Notes": {"rich_text": [{"text": {"content": data["notes"]}}]},
     #     "Link/DOI": {"url": data["link_doi"]}
     # }
-    retdata = {}
-    if "key" in data and data["key"]:
-        retdata["Key"] = {"title": [{"text": {"content": data["key"]}}]}
-    if "papertrail" in data and data["papertrail"]:
-        retdata["Papertrail"] = {"rich_text": [{"text": {"content": data["papertrail"]}}]}
-    if "bibtex" in data and data["bibtex"]:
-        retdata["Bibtex"] = {"rich_text": [{"text": {"content": data["bibtex"]}}]}
-    if "year" in data and data["year"]:
-        retdata["Year"] = {"number": int(data["year"])}
-    if "title" in data and data["title"]:
-        retdata["Title"] = {"rich_text": [{"text": {"content": data["title"]}}]}
-    if "project" in data and data["project"]:
-        retdata["Project_tag"] = {"multi_select": [{"name": data["project"]}]}
-    if "abstract" in data and data["abstract"]:
-        retdata["Abstract"] = {"rich_text": [{"text": {"content": data["abstract"]}}]}
-    if data["count"]:
-        retdata["Citation count"] = {"number": int(data["count"])}
-    if "type" in data and data["type"]:
-        retdata["Type"] = {"select": {"name": data["type"]}}
-    if "notes" in data and data["notes"]:
-        retdata["Notes"] = {"rich_text": [{"text": {"content": data["notes"]}}]}
-    if "link_doi" in data and data["link_doi"]:
-        retdata["Link/DOI"] = {"url": data["link_doi"]}
-    if "journal" in data and data["journal"]:
-        retdata["Journal"] = {"rich_text": [{"text": {"content": data["journal"]}}]}
-    if "venue" in data and data["venue"]:
-        retdata["Venue"] = {"select": {"name": data["venue"]}}
-    return retdata
+    # Property names and types come from configs/notion_schema.json, shared with NotionAPI
+    return NotionSchema.load().encode(data)
 
 #create_page(data)
 
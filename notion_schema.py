@@ -0,0 +1,191 @@
+from config_handler import ConfigHandler
+
+__all__ = ["NotionSchema", "NotionProperty"]
+
+# Notion accepts at most 2000 characters per text object and 100 objects per rich text array
+TEXT_SEGMENT_LENGTH = 2000
+MAX_TEXT_SEGMENTS = 100
+
+class NotionProperty:
+    """One property of the database: field name, Notion property name and type,
+    with the encode/decode functions for that type picked once."""
+
+    __slots__ = ("field", "name", "type", "encode", "decode")
+
+    def __init__(self, field, name, notion_type):
+        if notion_type not in ENCODERS:
+            raise ValueError(f"Unsupported notion_type '{notion_type}' for property '{name}'")
+        self.field = field
+        self.name = name
+        self.type = notion_type
+        self.encode = ENCODERS[notion_type]
+        self.decode = DECODERS[notion_type]
+
+    def encode_value(self, value):
+        """Encoded value, or the value that clears the property if value is empty."""
+        encoded = self.encode(value) if value else None
+        return encoded if encoded is not None else EMPTY_VALUES[self.type]
+
+    def __repr__(self):
+        return f"NotionProperty({self.field!r}, {self.name!r}, {self.type!r})"
+
+
+class NotionSchema:
+    """
+    The properties of the Notion reference database, loaded from
+    configs/notion_schema.json: {"properties": {field: {"name": ..., "type": ...}}}.
+
+    Encoders and decoders are compiled once per version of the file, so converting
+    pages is a plain loop over prebuilt callables.
+    """
+
+    DEFAULT_FILE = "notion_schema.json"
+
+    def __init__(self, config: dict):
+        self.properties = tuple(
+            NotionProperty(field, spec["name"], spec["type"])
+            for field, spec in config.get("properties", {}).items()
+        )
+        self.by_field = {prop.field: prop for prop in self.properties}
+
+    @classmethod
+    def load(cls, file_name: str = DEFAULT_FILE) -> "NotionSchema":
+        """The compiled schema of a config file, shared until the file changes."""
+        return ConfigHandler.load_derived(file_name, "notion_schema", cls)
+
+    def __iter__(self):
+        return iter(self.properties)
+
+    def __contains__(self, field):
+        return field in self.by_field
+
+    def __getitem__(self, field) -> NotionProperty:
+        return self.by_field[field]
+
+    def encode(self, data: dict) -> dict:
+        """Notion properties payload for the non-empty fields of data."""
+        properties = {}
+        for prop in self.properties:
+            value = data.get(prop.field)
+            if value:
+                encoded = prop.encode(value)
+                if encoded is not None:
+                    properties[prop.name] = {prop.type: encoded}
+        return properties
+
+    def encode_fields(self, data: dict) -> dict:
+        """Notion properties payload for exactly the fields of data; empty values clear the property."""
+        properties = {}
+        for field, value in data.items():
+            prop = self.by_field[field]
+            properties[prop.name] = {prop.type: prop.encode_value(value)}
+        return properties
+
+    def decode(self, properties: dict) -> dict:
+        """Field values of a page's properties; None for properties missing in the page."""
+        values = {}
+        for prop in self.properties:
+            notion_value = properties.get(prop.name)
+            values[prop.field] = prop.decode(notion_value) if notion_value is not None else None
+        return values
+
+
+# Encoders: Python value -> value of the Notion property (inside {type: ...}), None to skip
+
+def _encode_text(value):
+    """Rich text array with value split into segments Notion accepts; raises ValueError if it is too long."""
+    if len(value) > TEXT_SEGMENT_LENGTH * MAX_TEXT_SEGMENTS:
+        raise ValueError(f"Text of {len(value)} characters exceeds Notion's limit of "
+                         f"{MAX_TEXT_SEGMENTS} segments of {TEXT_SEGMENT_LENGTH} characters")
+    if len(value) <= TEXT_SEGMENT_LENGTH:
+        return [{"text": {"content": value}}]
+    return [{"text": {"content": value[start:start + TEXT_SEGMENT_LENGTH]}}
+            for start in range(0, len(value), TEXT_SEGMENT_LENGTH)]
+
+
+def _encode_number(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return ""
+
+
+def _encode_multi_select(value):
+    if isinstance(value, str):
+        return [{"name": value}]
+    if isinstance(value, list):
+        return [{"name": item} for item in value]
+    return None
+
+
+def _encode_select(value):
+    return {"name": value}
+
+
+def _encode_plain(value):
+    return value
+
+
+# Decoders: Notion property object -> Python value
+
+def _decode_text(notion_type):
+    def decode(notion_value):
+        # Long values are stored in several segments, see _encode_text
+        rich_text_data = notion_value.get(notion_type, [])
+        if not isinstance(rich_text_data, list):
+            return ""
+        return "".join(segment["text"].get("content", "") if "text" in segment else segment.get("plain_text", "")
+                       for segment in rich_text_data)
+    return decode
+
+
+def _decode_number(notion_value):
+    return notion_value.get("number", 0)
+
+
+def _decode_multi_select(notion_value):
+    return [item.get("name", "") for item in notion_value.get("multi_select", [])]
+
+
+def _decode_select(notion_value):
+    select_data = notion_value.get("select")
+    return select_data["name"] if isinstance(select_data, dict) and "name" in select_data else ""
+
+
+def _decode_url(notion_value):
+    return notion_value.get("url", "")
+
+
+def _decode_checkbox(notion_value):
+    return notion_value.get("checkbox", False)
+
+
+ENCODERS = {
+    "title": _encode_text,
+    "rich_text": _encode_text,
+    "number": _encode_number,
+    "multi_select": _encode_multi_select,
+    "select": _encode_select,
+    "url": _encode_plain,
+    "checkbox": _encode_plain,
+}
+
+EMPTY_VALUES = {
+    "title": [],
+    "rich_text": [],
+    "number": None,
+    "multi_select": [],
+    "select": None,
+    "url": None,
+    "checkbox": False,
+}
+
+DECODERS = {
+    "title": _decode_text("title"),
+    "rich_text": _decode_text("rich_text"),
+    "number": _decode_number,
+    "multi_select": _decode_multi_select,
+    "select": _decode_select,
+    "url": _decode_url,
+    "checkbox": _decode_checkbox,
+}
@@ -0,0 +1,140 @@
+import logging
+from concurrent.futures import wait
+
+__all__ = ["NotionUpdateQueue"]
+
+logger = logging.getLogger(__name__)
+
+class NotionUpdateQueue:
+    """
+    Coalesces edits of Notion pages into as few PATCH requests as possible.
+
+    Edits are collected per page id and only sent once no further edit for that page
+    arrived for `delay` milliseconds; all edits collected until then are merged
+    (later values win) and sent as one update_page_fields request. At most one
+    request per page is in flight, so updates of a page arrive in order.
+
+    Timers run on the Tk main loop (after/after_cancel) and requests on the
+    BackgroundWorker, so callbacks are called on the main thread.
+    """
+
+    DELAY = 1500  # milliseconds
+
+    def __init__(self, root, worker, api, mirror=None, delay=DELAY):
+        """
+        :param root: Tk widget whose after() schedules the flushes.
+        :param worker: BackgroundWorker the requests run on.
+        :param api: NotionAPI providing update_page_fields.
+        :param mirror: Optional NotionMirror that receives the updated pages.
+        :param delay: Quiet period in milliseconds before the edits of a page are sent.
+        """
+        self.root = root
+        self.worker = worker
+        self.api = api
+        self.mirror = mirror
+        self.delay = delay
+        self._pending = {}  # page id -> ({field: value}, [(on_success, on_error, widget), ...])
+        self._timers = {}  # page id -> after id of the scheduled flush
+        self._in_flight = set()
+        self._futures = {}  # page id -> (future, fields) of the request in flight
+
+    def enqueue(self, page_id, changes, on_success=None, on_error=None, widget=None):
+        """
+        Queue changed fields ({field: value}) of a page; restarts the page's quiet period.
+        :param on_success: Called with the updated page object once the merged request succeeded.
+        :param on_error: Called with the raised exception if it failed.
+        :param widget: Callbacks are dropped if this widget was destroyed in the meantime.
+        """
+        if not changes:
+            return
+        fields, callbacks = self._pending.setdefault(page_id, ({}, []))
+        fields.update(changes)
+        callbacks.append((on_success, on_error, widget))
+        self._schedule(page_id)
+
+    def pending(self, page_id):
+        """The changes of a page waiting to be sent."""
+        return dict(self._pending[page_id][0]) if page_id in self._pending else {}
+
+    def flush(self):
+        """Send all waiting edits now, e.g. before a window closes."""
+        for page_id in list(self._pending):
+            timer = self._timers.pop(page_id, None)
+            if timer is not None:
+                self.root.after_cancel(timer)
+            self._flush_page(page_id)
+
+    def wait(self, timeout=None):
+        """
+        Block until the update requests already running have finished; other jobs of
+        the worker are not waited for. Requests still queued behind such jobs are taken
+        back and left to drain().
+        """
+        running = []
+        for page_id, (future, fields) in list(self._futures.items()):
+            if future.cancel():
+                del self._futures[page_id]
+                self._in_flight.discard(page_id)
+                newer, callbacks = self._pending.get(page_id, ({}, []))
+                self._pending[page_id] = ({**fields, **newer}, callbacks)
+            else:
+                running.append(future)
+        wait(running, timeout)
+
+    def drain(self):
+        """
+        Send the edits still waiting synchronously, without callbacks. For shutdown,
+        after flush() and wait(): edits of pages that were in flight during flush()
+        are only left here.
+        """
+        for page_id in list(self._pending):
+            timer = self._timers.pop(page_id, None)
+            if timer is not None:
+                self.root.after_cancel(timer)
+            fields, _ = self._pending.pop(page_id)
+            try:
+                self._send(page_id, fields)
+            except Exception as error:
+                logger.error("Notion update of %s failed: %r", page_id, error)
+
+    def _schedule(self, page_id):
+        timer = self._timers.pop(page_id, None)
+        if timer is not None:
+            self.root.after_cancel(timer)
+        self._timers[page_id] = self.root.after(self.delay, self._flush_page, page_id)
+
+    def _flush_page(self, page_id):
+        self._timers.pop(page_id, None)
+        if page_id in self._in_flight:
+            # Sent once the running request of this page finished, with everything edited until then
+            self._schedule(page_id)
+            return
+        if page_id not in self._pending:
+            return
+        fields, callbacks = self._pending.pop(page_id)
+        self._in_flight.add(page_id)
+        future = self.worker.submit(self._send, page_id, fields,
+                                    on_success=lambda page_json: self._finish(page_id, callbacks, page_json, None),
+                                    on_error=lambda error: self._finish(page_id, callbacks, None, error))
+        self._futures[page_id] = (future, fields)
+
+    def _send(self, page_id, fields):
+        """Runs on the worker thread."""
+        page_json = self.api.update_page_fields(page_id, fields).json()
+        if self.mirror is not None:
+            self.mirror.upsert(page_json)
+        return page_json
+
+    def _finish(self, page_id, callbacks, page_json, error):
+        self._in_flight.discard(page_id)
+        self._futures.pop(page_id, None)
+        for on_success, on_error, widget in callbacks:
+            if widget is not None and not widget.winfo_exists():
+                continue
+            if error is None:
+                if on_success:
+                    on_success(page_json)
+            elif on_error:
+                on_error(error)
+            else:
+                logger.error("Notion update of %s failed: %r", page_id, error)
@@ -1,3 +1,4 @@
+import logging
 from abc import ABC, abstractmethod
 
 __all__ = [
@@ -10,6 +11,8 @@ __all__ = [
     "OutputFormatterFactory"
 ]
 
+logger = logging.getLogger(__name__)
+
 
 class OutputFormatter(ABC):
     def format_author(self, author, *args, **kwargs):
@@ -19,7 +22,7 @@ class OutputFormatter(ABC):
         return author_list._format(*args, **kwargs)
 
     def format_key(self, key, value):
-        print(f"called formatter with {key} and {value}")
+        logger.debug("format_key %s = %r", key, value)
         return value
 
     def format_final_entry(self, entry, *args, **kwargs):
@@ -0,0 +1,45 @@
+import threading
+import time
+
+__all__ = ["TokenBucket"]
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting the sustained request rate. Tokens refill at
+    `rate` per second up to `capacity`, which allows short bursts.
+    """
+
+    def __init__(self, rate: float = 3.0, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """
+        Take one token and return the number of seconds the caller has to wait
+        before using it. Lets sync and async callers share one bucket and sleep
+        in their own way.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        """Block until a token is available."""
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        """Hold back every caller for at least `seconds`, e.g. after a 429 with Retry-After."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -seconds * self.rate)